@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='feed_secret',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
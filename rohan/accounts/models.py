@@ -10,10 +10,22 @@ class UserProfile(models.Model):
     location = models.CharField(max_length=30, blank=True)
     birth_date = models.DateField(null=True, blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Part of the personal calendar feed URLs; replacing it revokes them
+    feed_secret = models.CharField(max_length=32, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Profiles are saved again with every User save, usually from a
+            # stale instance; only events.ical writes feed_secret
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'feed_secret'
+            ]
+        super().save(*args, **kwargs)
+
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import UserDashboardStats
 
-# Register your models here.
+
+@admin.register(UserDashboardStats)
+class UserDashboardStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_bookings', 'total_spent', 'unread_notifications', 'events_created']
+    search_fields = ['user__username']
+    readonly_fields = list_display
@@ -0,0 +1,258 @@
+"""
+Organizer sales analytics over hourly and daily rollups.
+
+update_rollups() reads only the bookings changed since the watermark (through
+the updated_at index), recomputes the hourly SalesRollup rows over the span
+of hours those changes touch, a chunk of events at a time, and then the daily
+rows from the hourly ones. It stops LAG seconds short of now, so transactions
+still committing with an older updated_at are picked up by the next run. The
+reports below read daily rollups only and never scan Booking.
+
+The reports aggregate with NumPy when it is installed; without it the same
+numbers come from plain Python loops.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from events.event_calendar import local_midnight
+from events.models import Booking, Event
+
+from .models import RollupWatermark, SalesRollup
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WATERMARK = 'sales'
+LAG = timedelta(seconds=getattr(settings, 'SALES_ROLLUP_LAG', 60))
+SOLD_STATUSES = ['confirmed', 'completed']
+COUNTERS = ('bookings', 'tickets_sold', 'revenue', 'cancellations', 'cancelled_tickets')
+# Sales lead time cohorts: weeks before the event, the last one open-ended
+LEAD_WEEKS = 5
+# Events whose rollups are recomputed together, keeping queries small
+EVENT_CHUNK = 200
+
+
+def _hour(value, tz):
+    """Start of the local hour, so that local days are made of whole hours"""
+    return timezone.localtime(value, tz).replace(minute=0, second=0, microsecond=0)
+
+
+def _chunks(event_ids):
+    event_ids = sorted(event_ids)
+    for start in range(0, len(event_ids), EVENT_CHUNK):
+        yield event_ids[start:start + EVENT_CHUNK]
+
+
+def _hourly_counters(event_ids, first_hour, end, tz):
+    """Counters by (event id, hour) from the bookings of these events in [first_hour, end)"""
+    counters = {}
+    bookings = Booking.objects.filter(event_id__in=event_ids)
+    sold = (
+        bookings.filter(status__in=SOLD_STATUSES, created_at__gte=first_hour, created_at__lt=end)
+        .annotate(hour=TruncHour('created_at', tzinfo=tz))
+        .values_list('event_id', 'hour')
+        .annotate(count=Count('id'), tickets=Sum('quantity'), revenue=Sum('total_amount'))
+    )
+    for event_id, hour, count, tickets, revenue in sold:
+        row = counters.setdefault((event_id, hour), dict.fromkeys(COUNTERS, 0))
+        row['bookings'], row['tickets_sold'], row['revenue'] = count, tickets, revenue
+    cancelled = (
+        bookings.filter(status='cancelled', updated_at__gte=first_hour, updated_at__lt=end)
+        .annotate(hour=TruncHour('updated_at', tzinfo=tz))
+        .values_list('event_id', 'hour')
+        .annotate(count=Count('id'), tickets=Sum('quantity'))
+    )
+    for event_id, hour, count, tickets in cancelled:
+        row = counters.setdefault((event_id, hour), dict.fromkeys(COUNTERS, 0))
+        row['cancellations'], row['cancelled_tickets'] = count, tickets
+    return counters
+
+
+def _replace(period, event_ids, first, end, counters, delete=True):
+    """Swap the rollups of these events in [first, end) for the counters that are not all zero.
+
+    counters must cover every bucket of the range, since the old rows of the
+    whole range are deleted.
+    """
+    if delete:
+        SalesRollup.objects.filter(
+            event_id__in=event_ids, period=period, bucket__gte=first, bucket__lt=end,
+        ).delete()
+    SalesRollup.objects.bulk_create(
+        [
+            SalesRollup(event_id=event_id, period=period, bucket=bucket, **values)
+            for (event_id, bucket), values in counters.items()
+            if any(values.values())
+        ],
+        batch_size=500,
+    )
+
+
+def _rebuild_hours(hours_by_event, tz, delete=True):
+    """Recompute hourly rows, per chunk of events, over the span of their changed hours"""
+    for event_ids in _chunks(hours_by_event):
+        first = min(min(hours_by_event[event_id]) for event_id in event_ids)
+        end = max(max(hours_by_event[event_id]) for event_id in event_ids) + timedelta(hours=1)
+        _replace('hour', event_ids, first, end, _hourly_counters(event_ids, first, end, tz), delete)
+
+
+def _rebuild_days(days_by_event, tz, delete=True):
+    """Recompute daily rows from the hourly rows, a chunk of events at a time"""
+    for event_ids in _chunks(days_by_event):
+        first = local_midnight(min(min(days_by_event[event_id]) for event_id in event_ids), tz)
+        last_day = max(max(days_by_event[event_id]) for event_id in event_ids)
+        end = local_midnight(last_day + timedelta(days=1), tz)
+        counters = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        hourly = SalesRollup.objects.filter(
+            event_id__in=event_ids, period='hour', bucket__gte=first, bucket__lt=end,
+        ).values_list('event_id', 'bucket', *COUNTERS)
+        for event_id, bucket, *values in hourly:
+            row = counters[event_id, local_midnight(timezone.localtime(bucket, tz).date(), tz)]
+            for name, value in zip(COUNTERS, values):
+                row[name] += value
+        _replace('day', event_ids, first, end, counters, delete)
+
+
+def update_rollups(full=False, now=None):
+    """Bring the rollups up to date, returns the number of changed bookings read"""
+    tz = timezone.get_current_timezone()
+    cutoff = (now or timezone.now()) - LAG
+    with transaction.atomic():
+        watermark, created = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        changed = Booking.objects.filter(updated_at__lte=cutoff)
+        if full:
+            SalesRollup.objects.all().delete()
+        elif watermark.updated_through:
+            changed = changed.filter(updated_at__gt=watermark.updated_through)
+
+        hours_by_event = defaultdict(set)
+        count = 0
+        for event_id, status, created_at, updated_at in (
+            changed.values_list('event_id', 'status', 'created_at', 'updated_at').iterator(chunk_size=2000)
+        ):
+            # A status change can add or remove a sale in the hour the booking was
+            # made, and a cancellation counts in the hour it happened
+            hours_by_event[event_id].add(_hour(created_at, tz))
+            if status == 'cancelled':
+                hours_by_event[event_id].add(_hour(updated_at, tz))
+            count += 1
+
+        if hours_by_event:
+            # After a full reset there are no old rows to delete
+            _rebuild_hours(hours_by_event, tz, delete=not full)
+            _rebuild_days({
+                event_id: {timezone.localtime(hour, tz).date() for hour in hours}
+                for event_id, hours in hours_by_event.items()
+            }, tz, delete=not full)
+        watermark.updated_through = cutoff
+        watermark.save()
+    return count
+
+
+def _bincount(indices, weights, length):
+    """Sum of weights per index in range(length)"""
+    if np is not None:
+        return np.bincount(
+            np.asarray(indices, dtype=np.int64), weights=np.asarray(weights, dtype=float), minlength=length,
+        )[:length].tolist()
+    totals = [0.0] * length
+    for index, weight in zip(indices, weights):
+        totals[index] += weight
+    return totals
+
+
+def _cumsum(values):
+    if np is not None:
+        return np.cumsum(values).tolist()
+    total, sums = 0, []
+    for value in values:
+        total += value
+        sums.append(total)
+    return sums
+
+
+def organizer_report(user, days=30):
+    """Sales of the events a user created, from daily rollups.
+
+    Returns the daily series over the last days days, the all-time totals per
+    event, and for each event the share of its tickets sold in each week
+    before the event.
+    """
+    tz = timezone.get_current_timezone()
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    events = list(Event.objects.filter(created_by=user).order_by('date').only('id', 'title', 'date'))
+    index = {event.pk: position for position, event in enumerate(events)}
+    event_days = [timezone.localtime(event.date, tz).date() for event in events]
+
+    rows = list(
+        SalesRollup.objects.filter(event__in=events, period='day')
+        .values_list('event_id', 'bucket', 'tickets_sold', 'revenue', 'cancellations')
+    )
+    event_idx = [index[row[0]] for row in rows]
+    row_days = [timezone.localtime(row[1], tz).date() for row in rows]
+    tickets = [row[2] for row in rows]
+    revenue = [float(row[3]) for row in rows]
+    cancellations = [row[4] for row in rows]
+
+    # Daily series over the window
+    in_window = [i for i, day in enumerate(row_days) if first_day <= day <= today]
+    offsets = [(row_days[i] - first_day).days for i in in_window]
+    series_tickets = _bincount(offsets, [tickets[i] for i in in_window], days)
+    series_revenue = _bincount(offsets, [revenue[i] for i in in_window], days)
+    series_cancellations = _bincount(offsets, [cancellations[i] for i in in_window], days)
+    cumulative_revenue = _cumsum(series_revenue)
+    series = [
+        {
+            'day': first_day + timedelta(days=offset),
+            'tickets': int(series_tickets[offset]),
+            'revenue': series_revenue[offset],
+            'cancellations': int(series_cancellations[offset]),
+            'cumulative_revenue': cumulative_revenue[offset],
+        }
+        for offset in range(days)
+    ]
+
+    # All-time totals per event
+    totals_tickets = _bincount(event_idx, tickets, len(events))
+    totals_revenue = _bincount(event_idx, revenue, len(events))
+    totals_cancellations = _bincount(event_idx, cancellations, len(events))
+
+    # Lead time cohorts: week of sale counted back from the event day
+    leads = [
+        min(max((event_days[e] - day).days // 7, 0), LEAD_WEEKS - 1)
+        for e, day in zip(event_idx, row_days)
+    ]
+    cohorts = _bincount([e * LEAD_WEEKS + lead for e, lead in zip(event_idx, leads)], tickets,
+                        len(events) * LEAD_WEEKS)
+
+    event_rows = []
+    for position, event in enumerate(events):
+        sold = totals_tickets[position]
+        weeks = cohorts[position * LEAD_WEEKS:(position + 1) * LEAD_WEEKS]
+        event_rows.append({
+            'event': event,
+            'tickets': int(sold),
+            'revenue': Decimal(totals_revenue[position]).quantize(Decimal('0.01')),
+            'cancellations': int(totals_cancellations[position]),
+            'lead_weeks': [round(100 * week / sold) if sold else 0 for week in weeks],
+        })
+
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).values_list('updated_through', flat=True).first()
+    return {
+        'series': series,
+        'events': event_rows,
+        'peak_tickets': max((day['tickets'] for day in series), default=0),
+        'updated_through': watermark,
+        'lead_week_labels': [f'{week}+ weeks' if week == LEAD_WEEKS - 1 else f'{week}-{week + 1} weeks'
+                             for week in range(LEAD_WEEKS)],
+    }
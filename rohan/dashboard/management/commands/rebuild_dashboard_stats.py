@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters of users from their bookings, notifications and events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Only these users (default: all)')
+
+    def handle(self, *args, **options):
+        count = stats.rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dashboard stats for {count} users.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard import analytics
+
+
+class Command(BaseCommand):
+    help = 'Fold bookings changed since the last run into the hourly and daily sales rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild the rollups from all bookings')
+
+    def handle(self, *args, **options):
+        count = analytics.update_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {count} changed bookings.'))
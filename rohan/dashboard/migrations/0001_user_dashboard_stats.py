@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_bookings', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('unread_notifications', models.PositiveIntegerField(default=0)),
+                ('events_created', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User dashboard stats',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_user_dashboard_stats'),
+        ('events', '0016_booking_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('updated_through', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('cancelled_tickets', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='events.event')),
+            ],
+            options={
+                'unique_together': {('event', 'period', 'bucket')},
+            },
+        ),
+    ]
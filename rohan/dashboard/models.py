@@ -1,3 +1,59 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class UserDashboardStats(models.Model):
+    """Counters shown on a user's dashboard.
+
+    Kept up to date by dashboard.signals with F() updates; the
+    rebuild_dashboard_stats command recomputes them from scratch.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dashboard_stats')
+    total_bookings = models.PositiveIntegerField(default=0)
+    # Sum of total_amount over confirmed bookings
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    unread_notifications = models.PositiveIntegerField(default=0)
+    events_created = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "User dashboard stats"
+
+    def __str__(self):
+        return f"Dashboard stats for {self.user.username}"
+
+
+class SalesRollup(models.Model):
+    """Bookings of one event in one hour or one day, built by dashboard.analytics.
+
+    tickets_sold and revenue count bookings that are still confirmed, in the
+    period they were made; cancellations count in the period they happened.
+    """
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    event = models.ForeignKey('events.Event', on_delete=models.CASCADE, related_name='sales_rollups')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    # Start of the hour, or local midnight starting the day
+    bucket = models.DateTimeField()
+    bookings = models.PositiveIntegerField(default=0)
+    tickets_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    cancelled_tickets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('event', 'period', 'bucket')
+
+    def __str__(self):
+        return f"{self.event} - {self.period} of {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class RollupWatermark(models.Model):
+    """Bookings updated up to this time are included in the rollups called name"""
+    name = models.CharField(max_length=50, unique=True)
+    updated_through = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} through {self.updated_through}"
@@ -0,0 +1,68 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from events.models import Booking, Event
+from events.signals import booking_status_changed
+from notifications.models import Notification
+from notifications.signals import notifications_read
+
+from . import stats
+
+
+def _spent(status, total_amount):
+    return total_amount if status == 'confirmed' else 0
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.adjust(instance.user_id, total_bookings=1,
+                     total_spent=_spent(instance.status, instance.total_amount))
+    else:
+        # Bookings are only saved again from the admin, which may change anything
+        stats.rebuild([instance.user_id])
+
+
+@receiver(booking_status_changed)
+def booking_status_updated(sender, user_id, total_amount, from_status, to_status, **kwargs):
+    stats.adjust(user_id, total_spent=_spent(to_status, total_amount) - _spent(from_status, total_amount))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    stats.adjust(instance.user_id, create=False, total_bookings=-1,
+                 total_spent=-_spent(instance.status, instance.total_amount))
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.adjust(instance.user_id, unread_notifications=0 if instance.is_read else 1)
+    else:
+        stats.rebuild([instance.user_id])
+
+
+@receiver(notifications_read)
+def notifications_marked_read(sender, user_id, count, **kwargs):
+    stats.adjust(user_id, unread_notifications=-count)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        stats.adjust(instance.user_id, create=False, unread_notifications=-1)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust(instance.created_by_id, events_created=1)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    stats.adjust(instance.created_by_id, create=False, events_created=-1)
@@ -0,0 +1,87 @@
+"""
+Maintenance of UserDashboardStats rows.
+
+Changes are applied as single F() UPDATEs in the transaction that caused
+them. A user's row is computed from scratch the first time it is needed, by
+the dashboard or by a change that adds to it; changes that only take away
+(deletions) never create rows, because they also run while a user is being
+deleted.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from events.models import Booking, Event
+from notifications.models import Notification
+
+from .models import UserDashboardStats
+
+FIELDS = ('total_bookings', 'total_spent', 'unread_notifications', 'events_created')
+
+
+def adjust(user_id, create=True, **deltas):
+    """Add deltas to the user's counters, computing the row first if it is missing"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or user_id is None:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    rows = UserDashboardStats.objects.filter(user_id=user_id)
+    if rows.update(**changes) or not create:
+        return
+    # A savepoint, so a failure here leaves the caller's transaction usable
+    with transaction.atomic():
+        # The change is already in the database, so a fresh count includes it
+        stats, created = _get_or_create(user_id)
+        if not created:
+            rows.update(**changes)
+
+
+def _get_or_create(user_id):
+    return UserDashboardStats.objects.get_or_create(user_id=user_id, defaults=compute([user_id])[user_id])
+
+
+def compute(user_ids=None):
+    """Counters by user id, for each of user_ids or else for every user with something to count"""
+    def scoped(queryset, field='user_id'):
+        return queryset if user_ids is None else queryset.filter(**{f'{field}__in': user_ids})
+
+    stats = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for user_id in user_ids or ():
+        stats[user_id] = dict.fromkeys(FIELDS, 0)
+    for user_id, count in scoped(Booking.objects.all()).values_list('user_id').annotate(n=Count('id')):
+        stats[user_id]['total_bookings'] = count
+    spent = scoped(Booking.objects.filter(status='confirmed')).values_list('user_id').annotate(total=Sum('total_amount'))
+    for user_id, total in spent:
+        stats[user_id]['total_spent'] = total or Decimal('0')
+    unread = scoped(Notification.objects.filter(is_read=False)).values_list('user_id').annotate(n=Count('id'))
+    for user_id, count in unread:
+        stats[user_id]['unread_notifications'] = count
+    created = scoped(Event.objects.filter(created_by__isnull=False), 'created_by_id')
+    for user_id, count in created.values_list('created_by_id').annotate(n=Count('id')):
+        stats[user_id]['events_created'] = count
+    return stats
+
+
+def rebuild(user_ids=None):
+    """Recompute the rows of user_ids (all users by default), returns how many were written"""
+    with transaction.atomic():
+        stats = compute(user_ids)
+        rows = UserDashboardStats.objects.all()
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        rows.delete()
+        UserDashboardStats.objects.bulk_create(
+            [UserDashboardStats(user_id=user_id, **counters) for user_id, counters in stats.items()],
+            batch_size=500,
+        )
+    return len(stats)
+
+
+def for_user(user):
+    """The user's stats row, computed now if it does not exist yet"""
+    try:
+        return UserDashboardStats.objects.get(user=user)
+    except UserDashboardStats.DoesNotExist:
+        return _get_or_create(user.pk)[0]
@@ -7,4 +7,6 @@ urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
     path('favorites/', views.favorites_view, name='favorites'),
     path('calendar/', views.calendar_view, name='calendar'),
+    path('agenda/', views.agenda_view, name='agenda'),
+    path('sales/', views.sales_view, name='sales'),
 ]
@@ -1,50 +1,52 @@
 from django.shortcuts import render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Count, Sum
+from django.conf import settings
+from events import event_calendar, ical, search_cache, search_log
+from events.forms import EventSearchForm
 from events.models import Event, UserFavorite, Booking
-from notifications.models import Notification
+from . import analytics, stats
 from django.utils import timezone
 import calendar
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+
+CALENDAR_CACHE_TIMEOUT = getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 60 * 60 * 24)
+AGENDA_MAX_DAYS = 31
+# Keep a year of room on both sides, so that prev/next links, the weeks that
+# spill into neighbouring months and timezone offsets stay within date's range
+FIRST_YEAR = date.min.year + 1
+LAST_YEAR = date.max.year - 1
+SALES_REPORT_DAYS = (7, 30, 90)
 
 
 @login_required
 def dashboard_view(request):
     # Get user's favorite events
-    favorites = UserFavorite.objects.filter(user=request.user).select_related('event')[:4]
+    favorites = list(UserFavorite.objects.filter(user=request.user).select_related('event__venue')[:4])
 
     # Get upcoming events for calendar view
     today = timezone.now()
     upcoming_events = Event.objects.filter(
         date__gte=today,
         is_active=True
-    ).order_by('date')[:10]
+    ).select_related('venue').order_by('date')[:10]
 
     # Search functionality
     query = request.GET.get('q', '')
     search_results = []
     if query:
-        search_results = Event.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(venue__name__icontains=query),
-            is_active=True
-        )[:5]
+        search_form = EventSearchForm({'query': query})
+        if search_form.is_valid():
+            with search_log.logged(search_form, 'dashboard') as record:
+                events = Event.objects.filter(is_active=True).select_related('venue')
+                search_results = list(search_form.filter_events(events)[:5])
+                record.results = len(search_results)
 
     # Get user's bookings
-    recent_bookings = Booking.objects.filter(user=request.user).order_by('-created_at')[:5]
-
-    # Get user statistics
-    total_bookings = Booking.objects.filter(user=request.user).count()
-    total_spent = Booking.objects.filter(user=request.user, status='confirmed').aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-
-    # Get unread notifications
-    unread_notifications = Notification.objects.filter(user=request.user, is_read=False).count()
+    recent_bookings = Booking.objects.filter(user=request.user).select_related('event').order_by('-created_at')[:5]
 
-    # Get events created by user
-    my_events_count = Event.objects.filter(created_by=request.user).count()
+    # Booking, notification and event counters, kept up to date by dashboard.signals
+    user_stats = stats.for_user(request.user)
 
     context = {
         'favorites': favorites,
@@ -52,41 +54,51 @@ def dashboard_view(request):
         'search_results': search_results,
         'query': query,
         'recent_bookings': recent_bookings,
-        'total_bookings': total_bookings,
-        'total_spent': total_spent,
-        'unread_notifications': unread_notifications,
-        'my_events_count': my_events_count,
+        'total_bookings': user_stats.total_bookings,
+        'total_spent': user_stats.total_spent,
+        'unread_notifications': user_stats.unread_notifications,
+        'my_events_count': user_stats.events_created,
     }
     return render(request, 'dashboard/dashboard.html', context)
 
 
 @login_required
 def favorites_view(request):
-    favorites = UserFavorite.objects.filter(user=request.user).select_related('event')
+    favorites = list(UserFavorite.objects.filter(user=request.user).select_related('event'))
     context = {
         'favorites': favorites,
+        'favorite_events': [favorite.event for favorite in favorites],
+        'feed_url': request.build_absolute_uri(
+            reverse('events:favorites_feed', args=[ical.user_token(request.user)])
+        ),
     }
     return render(request, 'dashboard/favorites.html', context)
 
 
+def _int_param(request, name, default, low, high):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        return default
+    return min(max(value, low), high)
+
+
+def _calendar_cache_context():
+    """What the cached calendar fragments are keyed on besides their dates"""
+    return {
+        'cache_timeout': CALENDAR_CACHE_TIMEOUT,
+        'catalog_version': search_cache.catalog_version(),
+        'timezone_name': timezone.get_current_timezone_name(),
+    }
+
+
 @login_required
 def calendar_view(request):
-    today = timezone.now()
+    today = timezone.localdate()
 
     # Get current month and year
-    month = int(request.GET.get('month', today.month))
-    year = int(request.GET.get('year', today.year))
-
-    # Get events for the current month
-    events = Event.objects.filter(
-        date__year=year,
-        date__month=month,
-        is_active=True
-    ).order_by('date')
-
-    # Create calendar
-    cal = calendar.monthcalendar(year, month)
-    month_name = calendar.month_name[month]
+    month = _int_param(request, 'month', today.month, 1, 12)
+    year = _int_param(request, 'year', today.year, FIRST_YEAR, LAST_YEAR)
 
     # Previous and next month navigation
     prev_month = month - 1 if month > 1 else 12
@@ -95,14 +107,51 @@ def calendar_view(request):
     next_year = year if month < 12 else year + 1
 
     context = {
-        'calendar': cal,
-        'events': events,
+        # Called by the template only when the cached month is missing
+        'calendar_month': lambda: event_calendar.month(year, month),
         'month': month,
         'year': year,
-        'month_name': month_name,
+        'month_name': calendar.month_name[month],
         'prev_month': prev_month,
         'prev_year': prev_year,
         'next_month': next_month,
         'next_year': next_year,
+        **_calendar_cache_context(),
     }
     return render(request, 'dashboard/calendar.html', context)
+
+
+@login_required
+def agenda_view(request):
+    try:
+        start = date.fromisoformat(request.GET.get('start', ''))
+    except ValueError:
+        start = timezone.localdate()
+    start = min(max(start, date(FIRST_YEAR, 1, 1)), date(LAST_YEAR, 12, 31))
+    days = _int_param(request, 'days', 7, 1, AGENDA_MAX_DAYS)
+
+    context = {
+        'agenda': lambda: event_calendar.agenda(start, days),
+        'start': start,
+        'end': start + timedelta(days=days - 1),
+        'days': days,
+        'prev_start': start - timedelta(days=days),
+        'next_start': start + timedelta(days=days),
+        **_calendar_cache_context(),
+    }
+    return render(request, 'dashboard/agenda.html', context)
+
+
+@login_required
+def sales_view(request):
+    days = _int_param(request, 'days', 30, 1, max(SALES_REPORT_DAYS))
+    if days not in SALES_REPORT_DAYS:
+        days = 30
+
+    context = {
+        # Read from the rollups only, see dashboard/analytics.py
+        'report': analytics.organizer_report(request.user, days),
+        'days': days,
+        'day_choices': SALES_REPORT_DAYS,
+    }
+    return render(request, 'dashboard/sales.html', context)
@@ -1,26 +1,42 @@
 from django.contrib import admin
-from .models import Category, Venue, Event, UserFavorite, Review, Booking, Ticket
+from . import ratings
+from .models import Category, Venue, Section, Event, EventRatingSummary, WaitingRoom, UserFavorite, Review, Booking, Ticket
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug']
+    list_display = ['name', 'slug', 'show_on_homepage', 'homepage_order']
+    list_editable = ['show_on_homepage', 'homepage_order']
     prepopulated_fields = {'slug': ('name',)}
 
 
+class SectionInline(admin.TabularInline):
+    model = Section
+    extra = 0
+
+
 @admin.register(Venue)
 class VenueAdmin(admin.ModelAdmin):
     list_display = ['name', 'city', 'state', 'capacity']
     list_filter = ['city', 'state']
     search_fields = ['name', 'city']
+    readonly_fields = ['geohash']
+    inlines = [SectionInline]
+
+
+class WaitingRoomInline(admin.StackedInline):
+    model = WaitingRoom
+    extra = 0
+    readonly_fields = ['issued_count', 'next_admission_at']
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ['title', 'category', 'venue', 'date', 'price', 'is_active']
+    list_display = ['title', 'category', 'venue', 'date', 'price', 'seats_remaining', 'is_active']
     list_filter = ['category', 'is_active', 'date']
     search_fields = ['title', 'description']
     date_hierarchy = 'date'
+    inlines = [WaitingRoomInline]
 
 
 @admin.register(UserFavorite)
@@ -34,11 +50,22 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ['event', 'user', 'rating', 'created_at']
     list_filter = ['rating', 'created_at']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Edits here are rare, so recount the affected events instead of adjusting them
+        ratings.rebuild({obj.event_id, form.initial.get('event', obj.event_id)})
+
+
+@admin.register(EventRatingSummary)
+class EventRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ['event', 'count', 'average']
+    readonly_fields = ['event', 'count', 'total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
 
 class TicketInline(admin.TabularInline):
     model = Ticket
     extra = 0
-    readonly_fields = ['ticket_number']
+    readonly_fields = ['ticket_number', 'seat_label']
 
 
 @admin.register(Booking)
@@ -0,0 +1,297 @@
+"""
+Per-process prefix index for search box suggestions.
+
+Every word of an event title, venue name and city is kept in one sorted
+list of (term, kind, rank, key) tuples, so all entries starting with a prefix
+are a bisect plus a short contiguous scan. Within a term, events are stored
+soonest and most popular first, so the capped scan sees the best ones. The
+index is built on the first lookup, patched in place by the Event and Venue
+signal handlers and fully rebuilt every AUTOCOMPLETE_INDEX_TTL seconds,
+which picks up changes made by other processes and refreshes popularity.
+The rebuild runs in a background thread while lookups keep using the old
+index; patches made meanwhile are replayed onto the new one.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Sum
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .models import Booking, Event, UserFavorite, Venue
+
+logger = logging.getLogger(__name__)
+
+INDEX_TTL = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 600)
+# Upper bound on index entries examined per lookup, keeps short prefixes cheap
+MAX_SCAN = 1000
+LIMITS = {'event': 5, 'venue': 3, 'city': 3}
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def words(text):
+    return re.findall(r'\w+', normalize(text))
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.terms = []
+        self.entry_terms = {}
+        self.events = {}
+        self.venues = {}
+        self.venue_events = defaultdict(set)
+        self.city_names = {}
+        self.city_venues = defaultdict(set)
+        self.built_at = time.monotonic()
+
+    @property
+    def is_stale(self):
+        return time.monotonic() - self.built_at > INDEX_TTL
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        popularity = defaultdict(int)
+        sold = Booking.objects.filter(status__in=['confirmed', 'completed']).values('event_id').annotate(
+            tickets=Sum('quantity')
+        )
+        for row in sold:
+            popularity[row['event_id']] += row['tickets'] or 0
+        for row in UserFavorite.objects.values('event_id').annotate(favorites=Count('id')):
+            popularity[row['event_id']] += row['favorites']
+
+        for venue_id, name, city in Venue.objects.values_list('id', 'name', 'city'):
+            index._add_venue(venue_id, name, city)
+        events = Event.objects.filter(is_active=True, date__gte=timezone.now()).values_list(
+            'id', 'title', 'date', 'venue_id'
+        )
+        for event_id, title, date, venue_id in events.iterator(chunk_size=2000):
+            index._add_event(event_id, title, date, venue_id, popularity[event_id])
+        index.terms.sort()
+        return index
+
+    def _insert(self, kind, key, text, rank=(), sort=False):
+        terms = set(words(text))
+        self.entry_terms[(kind, key)] = (terms, rank)
+        for term in terms:
+            item = (term, kind, rank, key)
+            if sort:
+                bisect.insort(self.terms, item)
+            else:
+                self.terms.append(item)
+
+    def _remove(self, kind, key):
+        terms, rank = self.entry_terms.pop((kind, key), ((), ()))
+        for term in terms:
+            item = (term, kind, rank, key)
+            position = bisect.bisect_left(self.terms, item)
+            if position < len(self.terms) and self.terms[position] == item:
+                del self.terms[position]
+
+    def _add_event(self, event_id, title, date, venue_id, popularity, sort=False):
+        self.events[event_id] = {'title': title, 'date': date, 'venue_id': venue_id, 'popularity': popularity}
+        self.venue_events[venue_id].add(event_id)
+        # Soonest first; on the same day the most popular first
+        rank = (date.toordinal(), -popularity, date)
+        self._insert('event', event_id, title, rank, sort)
+
+    def _add_venue(self, venue_id, name, city, sort=False):
+        city_key = normalize(city).strip()
+        self.venues[venue_id] = {'name': name, 'city': city, 'city_key': city_key}
+        self._insert('venue', venue_id, name, sort=sort)
+        if city_key:
+            if city_key not in self.city_names:
+                self.city_names[city_key] = city
+                self._insert('city', city_key, city, sort=sort)
+            self.city_venues[city_key].add(venue_id)
+
+    def update_event(self, event):
+        """Re-index one event after it was saved"""
+        with self.lock:
+            old = self.events.pop(event.pk, None)
+            if old:
+                self.venue_events[old['venue_id']].discard(event.pk)
+            self._remove('event', event.pk)
+            if event.is_active:
+                popularity = old['popularity'] if old else 0
+                self._add_event(event.pk, event.title, event.date, event.venue_id, popularity, sort=True)
+
+    def remove_event(self, event_id):
+        with self.lock:
+            old = self.events.pop(event_id, None)
+            if old:
+                self.venue_events[old['venue_id']].discard(event_id)
+            self._remove('event', event_id)
+
+    def update_venue(self, venue):
+        """Re-index one venue after it was saved"""
+        with self.lock:
+            self.remove_venue(venue.pk)
+            self._add_venue(venue.pk, venue.name, venue.city, sort=True)
+
+    def remove_venue(self, venue_id):
+        with self.lock:
+            old = self.venues.pop(venue_id, None)
+            self._remove('venue', venue_id)
+            if old and old['city_key']:
+                self.city_venues[old['city_key']].discard(venue_id)
+                if not self.city_venues[old['city_key']]:
+                    del self.city_venues[old['city_key']]
+                    del self.city_names[old['city_key']]
+                    self._remove('city', old['city_key'])
+
+    def _candidates(self, query_words):
+        """(kind, key) of entries with a term starting with every query word"""
+        # Scan for the longest word, it has the fewest matching entries, and
+        # check the other words against each candidate's own terms
+        word, *others = sorted(query_words, key=len, reverse=True)
+        found = {}
+        position = bisect.bisect_left(self.terms, (word,))
+        end = min(len(self.terms), position + MAX_SCAN)
+        while position < end and self.terms[position][0].startswith(word):
+            term, kind, rank, key = self.terms[position]
+            found[(kind, key)] = rank
+            position += 1
+        return [
+            (kind, key) for (kind, key), rank in sorted(found.items(), key=lambda item: (item[0][0], item[1]))
+            if all(any(term.startswith(other) for term in self.entry_terms[(kind, key)][0]) for other in others)
+        ]
+
+    def suggest(self, text):
+        query_words = words(text)
+        if not query_words:
+            return []
+        now = timezone.now()
+
+        with self.lock:
+            grouped = defaultdict(list)
+            for kind, key in self._candidates(query_words):
+                grouped[kind].append(key)
+
+            # Candidates come in rank order already
+            events = [(key, self.events[key]) for key in grouped['event']
+                      if key in self.events and self.events[key]['date'] >= now]
+
+            def upcoming(venue_ids):
+                return sum(
+                    1 for venue_id in venue_ids
+                    for event_id in self.venue_events.get(venue_id, ())
+                    if self.events[event_id]['date'] >= now
+                )
+
+            venues = sorted(
+                (key for key in grouped['venue'] if key in self.venues),
+                key=lambda key: (-upcoming([key]), self.venues[key]['name'])
+            )
+            cities = sorted(
+                (key for key in grouped['city'] if key in self.city_names),
+                key=lambda key: (-upcoming(self.city_venues[key]), key)
+            )
+
+            results = []
+            for event_id, event in events[:LIMITS['event']]:
+                venue = self.venues.get(event['venue_id'], {})
+                results.append({
+                    'type': 'event',
+                    'label': event['title'],
+                    'detail': f"{venue.get('name', '')} · {timezone.localtime(event['date']):%b %d, %Y}",
+                    'url': reverse('events:event_detail', args=[event_id]),
+                })
+            for venue_id in venues[:LIMITS['venue']]:
+                venue = self.venues[venue_id]
+                results.append({
+                    'type': 'venue',
+                    'label': venue['name'],
+                    'detail': venue['city'],
+                    'url': reverse('events:advanced_search') + '?' + urlencode({'location': venue['name']}),
+                })
+            for city_key in cities[:LIMITS['city']]:
+                city = self.city_names[city_key]
+                results.append({
+                    'type': 'city',
+                    'label': city,
+                    'detail': 'City',
+                    'url': reverse('events:advanced_search') + '?' + urlencode({'location': city}),
+                })
+            return results
+
+
+_index = None
+_index_lock = threading.Lock()
+# Patches made while a background rebuild runs, None when none is running
+_pending = None
+
+
+def _rebuild():
+    global _index, _pending
+    try:
+        index = PrefixIndex.build()
+        with _index_lock:
+            for patch in _pending:
+                patch(index)
+            _index = index
+    except Exception:
+        logger.exception('Rebuilding the autocomplete index failed')
+        # Keep the old index for another INDEX_TTL before trying again
+        _index.built_at = time.monotonic()
+    finally:
+        with _index_lock:
+            _pending = None
+        connections.close_all()
+
+
+def get_index():
+    """Return the process-wide index, starting a background rebuild when it is stale"""
+    global _index, _pending
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PrefixIndex.build()
+    elif _index.is_stale and _pending is None:
+        with _index_lock:
+            if _index.is_stale and _pending is None:
+                _pending = []
+                threading.Thread(target=_rebuild, name='autocomplete-index', daemon=True).start()
+    return _index
+
+
+def _patch(patch):
+    """Apply a change to the current index, and to the one being built if any"""
+    with _index_lock:
+        if _index is not None:
+            patch(_index)
+        if _pending is not None:
+            _pending.append(patch)
+
+
+def event_saved(event):
+    _patch(lambda index: index.update_event(event))
+
+
+def event_deleted(event_id):
+    _patch(lambda index: index.remove_event(event_id))
+
+
+def venue_saved(venue):
+    _patch(lambda index: index.update_venue(venue))
+
+
+def venue_deleted(venue_id):
+    _patch(lambda index: index.remove_venue(venue_id))
+
+
+def suggest(text):
+    return get_index().suggest(text)
@@ -0,0 +1,209 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Booking, Ticket
+
+INDEX_TTL = getattr(settings, 'CHECKIN_INDEX_TTL', 300)
+LOOKUP_CHUNK = 500
+ADMIT_CHUNK = 500
+ADMITTED_STATUSES = ['confirmed', 'completed']
+MAX_UNKNOWN = 100000
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class TicketIndex:
+    """In-memory map of an event's valid ticket numbers for O(1) gate checks.
+
+    Maps ticket_number -> [ticket_id, used_at]. The database stays the source
+    of truth: admissions are only recorded by a conditional write, so gates
+    served by different processes can never both admit the same ticket.
+    """
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.lock = threading.Lock()
+        self.tickets = {}
+        # Numbers looked up and not found, so repeated bad scans cost nothing
+        self.unknown = set()
+        self.loaded_at = 0
+        self.load()
+
+    def _rows(self):
+        return Ticket.objects.filter(
+            booking__event_id=self.event_id,
+            booking__status__in=ADMITTED_STATUSES
+        ).values_list('ticket_number', 'id', 'used_at', 'is_used')
+
+    def load(self):
+        tickets = {
+            number: [ticket_id, used_at or (timezone.now() if is_used else None)]
+            for number, ticket_id, used_at, is_used in self._rows().iterator(chunk_size=5000)
+        }
+        with self.lock:
+            self.tickets = tickets
+            self.unknown = set()
+            self.loaded_at = time.monotonic()
+
+    @property
+    def is_stale(self):
+        return time.monotonic() - self.loaded_at > INDEX_TTL
+
+    def get_many(self, ticket_numbers):
+        """Map the known ticket numbers among ticket_numbers to their [ticket_id, used_at] entries.
+
+        Numbers not in the index (sold after it was loaded, or not tickets at
+        all) are looked up together, a chunk of LOOKUP_CHUNK per query.
+        """
+        with self.lock:
+            missing = {
+                number for number in ticket_numbers
+                if number not in self.tickets and number not in self.unknown
+            }
+        if missing:
+            found = {}
+            missing = sorted(missing)
+            for start in range(0, len(missing), LOOKUP_CHUNK):
+                rows = self._rows().filter(ticket_number__in=missing[start:start + LOOKUP_CHUNK])
+                for number, ticket_id, used_at, is_used in rows:
+                    found[number] = [ticket_id, used_at or (timezone.now() if is_used else None)]
+            with self.lock:
+                self.tickets.update(found)
+                if len(self.unknown) > MAX_UNKNOWN:
+                    self.unknown.clear()
+                self.unknown.update(number for number in missing if number not in found)
+        with self.lock:
+            return {number: self.tickets[number] for number in ticket_numbers if number in self.tickets}
+
+    def get(self, ticket_number):
+        return self.get_many([ticket_number]).get(ticket_number)
+
+    def manifest(self):
+        with self.lock:
+            return [
+                {'ticket_number': number, 'used': used_at is not None}
+                for number, (ticket_id, used_at) in self.tickets.items()
+            ]
+
+
+def get_index(event_id):
+    """Return the process-wide ticket index for an event, reloading it when stale"""
+    with _indexes_lock:
+        index = _indexes.get(event_id)
+        if index is None:
+            index = _indexes[event_id] = TicketIndex(event_id)
+            return index
+    if index.is_stale:
+        index.load()
+    return index
+
+
+def _scan_time(scan, default):
+    value = scan.get('scanned_at')
+    scanned_at = parse_datetime(value) if isinstance(value, str) else None
+    if scanned_at is None:
+        return default
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    return min(scanned_at, default)
+
+
+def _admit(ticket_ids):
+    """Mark unused tickets as used, returns the ids of the tickets this call took.
+
+    ticket_ids maps ticket id -> (number, scanned_at). Each chunk is a single
+    conditional UPDATE ... RETURNING, so of two gates racing for a ticket
+    exactly one gets its id back.
+    """
+    ticket_table = connection.ops.quote_name(Ticket._meta.db_table)
+    booking_table = connection.ops.quote_name(Booking._meta.db_table)
+    statuses = ', '.join(['%s'] * len(ADMITTED_STATUSES))
+    ids = sorted(ticket_ids)
+    admitted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), ADMIT_CHUNK):
+            chunk = ids[start:start + ADMIT_CHUNK]
+            params = []
+            for ticket_id in chunk:
+                params += [ticket_id, connection.ops.adapt_datetimefield_value(ticket_ids[ticket_id][1])]
+            params += chunk + [False] + ADMITTED_STATUSES
+            cursor.execute(
+                f"UPDATE {ticket_table} SET is_used = %s, "
+                f"used_at = CASE id {' '.join(['WHEN %s THEN %s'] * len(chunk))} END "
+                f"WHERE id IN ({', '.join(['%s'] * len(chunk))}) AND is_used = %s "
+                f"AND booking_id IN (SELECT id FROM {booking_table} WHERE status IN ({statuses})) "
+                "RETURNING id",
+                [True] + params
+            )
+            admitted += [row[0] for row in cursor.fetchall()]
+    return admitted
+
+
+def process_scans(event, scans, offline=False):
+    """Validate a batch of gate scans and admit the valid ones in bulk.
+
+    Live batches are admitted at the current time in the order received.
+    Offline batches are buffered scans uploaded later by a gate device: they
+    are ordered by their scanned_at time and the earliest scan of a ticket
+    wins. Every scan gets one of these statuses:
+
+    admitted      first valid scan, the ticket is now used
+    duplicate     the ticket was already admitted earlier in this batch
+    already_used  the ticket had been used before this batch
+    invalid       unknown ticket number, or not a ticket for this event
+    """
+    now = timezone.now()
+    index = get_index(event.pk)
+
+    entries = []
+    for position, scan in enumerate(scans):
+        number = str(scan.get('ticket_number', '')).strip().upper()
+        scanned_at = _scan_time(scan, now) if offline else now
+        entries.append((scanned_at, position, number))
+    if offline:
+        entries.sort()
+
+    results = [None] * len(entries)
+    known = index.get_many({number for scanned_at, position, number in entries if number})
+    winners = {}
+    for scanned_at, position, number in entries:
+        entry = known.get(number)
+        if entry is None:
+            results[position] = {'ticket_number': number, 'status': 'invalid'}
+        elif number in winners:
+            results[position] = {'ticket_number': number, 'status': 'duplicate',
+                                 'used_at': winners[number][1].isoformat()}
+        elif entry[1] is not None:
+            results[position] = {'ticket_number': number, 'status': 'already_used',
+                                 'used_at': entry[1].isoformat()}
+        else:
+            winners[number] = (position, scanned_at)
+
+    admitted = set()
+    if winners:
+        ticket_ids = {known[number][0]: (number, scanned_at) for number, (position, scanned_at) in winners.items()}
+        with transaction.atomic():
+            for admitted_id in _admit(ticket_ids):
+                admitted.add(ticket_ids[admitted_id][0])
+
+    for number, (position, scanned_at) in winners.items():
+        entry = known[number]
+        if number in admitted:
+            entry[1] = scanned_at
+            results[position] = {'ticket_number': number, 'status': 'admitted'}
+        else:
+            # Another gate got there first; fix the stale index entry
+            entry[1] = entry[1] or now
+            results[position] = {'ticket_number': number, 'status': 'already_used',
+                                 'used_at': entry[1].isoformat()}
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return results, summary
@@ -5,8 +5,12 @@ from django.conf import settings
 from notifications.views import create_notification
 
 
-def send_booking_confirmation_email(booking):
-    """Send booking confirmation email to user"""
+def send_booking_confirmation_email(booking, fail_silently=True):
+    """Send booking confirmation email to user.
+
+    Errors are swallowed unless fail_silently is False, which the outbox
+    worker uses so failed deliveries are retried.
+    """
     try:
         # Get user's notification preferences
         preferences = getattr(booking.user, 'notification_preferences', None)
@@ -38,11 +42,13 @@ def send_booking_confirmation_email(booking):
         return True
         
     except Exception as e:
+        if not fail_silently:
+            raise
         print(f"Error sending booking confirmation email: {e}")
         return False
 
 
-def send_booking_cancellation_email(booking):
+def send_booking_cancellation_email(booking, fail_silently=True):
     """Send booking cancellation email to user"""
     try:
         # Get user's notification preferences
@@ -80,6 +86,8 @@ The EventSphere Team
         return True
         
     except Exception as e:
+        if not fail_silently:
+            raise
         print(f"Error sending booking cancellation email: {e}")
         return False
 
@@ -0,0 +1,65 @@
+"""
+Active events bucketed by local calendar day.
+
+A span of days becomes one half-open datetime range, from the midnight
+starting the first day to the midnight ending the last one, in the current
+timezone. The (date, id) index on Event serves that range directly, unlike
+date__year/date__month lookups, and the events are sorted into per-day
+buckets in a single pass. The month calendar and the agenda both read
+through here; their rendered HTML is cached by catalog version in the
+templates.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Event
+
+# Weeks start on Sunday, like the calendar table header
+WEEKS = calendar.Calendar(firstweekday=calendar.SUNDAY)
+
+
+def local_midnight(day, tz):
+    return timezone.make_aware(datetime.combine(day, time.min), tz)
+
+
+def events_by_day(first_day, last_day, tz=None):
+    """Dict from every day in first_day..last_day (inclusive) to its events, in date order"""
+    tz = tz or timezone.get_current_timezone()
+    days = {first_day + timedelta(days=n): [] for n in range((last_day - first_day).days + 1)}
+    events = (
+        Event.objects.filter(
+            is_active=True,
+            date__gte=local_midnight(first_day, tz),
+            date__lt=local_midnight(last_day + timedelta(days=1), tz),
+        )
+        .select_related('venue')
+        .order_by('date', 'id')
+    )
+    for event in events:
+        days[timezone.localtime(event.date, tz).date()].append(event)
+    return days
+
+
+def month(year, month_number, tz=None):
+    """The month as Sunday-first weeks of (day, events), plus all its events in order.
+
+    Days of the neighbouring months that fill the first and last weeks are
+    (None, []).
+    """
+    last_day = calendar.monthrange(year, month_number)[1]
+    days = events_by_day(date(year, month_number, 1), date(year, month_number, last_day), tz)
+    weeks = [
+        [(day, days[day]) if day.month == month_number else (None, []) for day in week]
+        for week in WEEKS.monthdatescalendar(year, month_number)
+    ]
+    return {
+        'weeks': weeks,
+        'events': [event for day_events in days.values() for event in day_events],
+    }
+
+
+def agenda(first_day, day_count, tz=None):
+    """List of (day, events) for day_count days from first_day"""
+    return list(events_by_day(first_day, first_day + timedelta(days=day_count - 1), tz).items())
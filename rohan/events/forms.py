@@ -1,6 +1,7 @@
 from django import forms
 from django.db import models
 from .models import Category, Event, Venue
+from . import geo, search
 from django.utils import timezone
 
 
@@ -28,7 +29,9 @@ class EventSearchForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Search events, venues, or locations...'
+            'placeholder': 'Search events, venues, or locations...',
+            'autocomplete': 'off',
+            'data-autocomplete': 'true'
         })
     )
     
@@ -59,65 +62,199 @@ class EventSearchForm(forms.Form):
             'placeholder': 'City or venue...'
         })
     )
+
+    RADIUS_CHOICES = [
+        ('', 'Any Distance'),
+        ('5', 'Within 5 miles'),
+        ('10', 'Within 10 miles'),
+        ('25', 'Within 25 miles'),
+        ('50', 'Within 50 miles'),
+        ('100', 'Within 100 miles'),
+    ]
+
+    SORT_CHOICES = [
+        ('', 'Best Match'),
+        ('date', 'Date'),
+        ('distance', 'Nearest First'),
+    ]
+
+    latitude = forms.FloatField(min_value=-90, max_value=90, required=False, widget=forms.HiddenInput)
+    longitude = forms.FloatField(min_value=-180, max_value=180, required=False, widget=forms.HiddenInput)
+
+    radius = forms.ChoiceField(
+        choices=RADIUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    sort = forms.ChoiceField(
+        choices=SORT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # About 100m of precision is plenty, and nearby searchers share cached results
+        for field in ('latitude', 'longitude'):
+            if cleaned_data.get(field) is not None:
+                cleaned_data[field] = round(cleaned_data[field], 3)
+        has_point = cleaned_data.get('latitude') is not None and cleaned_data.get('longitude') is not None
+        if (cleaned_data.get('radius') or cleaned_data.get('sort') == 'distance') and not has_point:
+            raise forms.ValidationError('Share your location to search by distance.')
+        return cleaned_data
+
+    @property
+    def point(self):
+        """(latitude, longitude) of the searcher, or None"""
+        cleaned_data = getattr(self, 'cleaned_data', {})
+        latitude = cleaned_data.get('latitude')
+        longitude = cleaned_data.get('longitude')
+        if latitude is None or longitude is None:
+            return None
+        return latitude, longitude
+
+    @property
+    def uses_distance(self):
+        """True if results are limited or ordered by distance from the searcher"""
+        cleaned_data = getattr(self, 'cleaned_data', {})
+        return self.point is not None and bool(cleaned_data.get('radius') or cleaned_data.get('sort') == 'distance')
     
-    def filter_events(self, queryset):
-        """Apply filters to the event queryset"""
+    def price_filters(self):
+        """Q object for every PRICE_CHOICES bucket"""
+        return {
+            '0-25': models.Q(price__lte=25),
+            '25-50': models.Q(price__gte=25, price__lte=50),
+            '50-100': models.Q(price__gte=50, price__lte=100),
+            '100-200': models.Q(price__gte=100, price__lte=200),
+            '200+': models.Q(price__gte=200),
+        }
+
+    def date_filters(self):
+        """Q object for every DATE_CHOICES bucket"""
+        now = timezone.now()
+        tomorrow = now + timezone.timedelta(days=1)
+        week_end = now + timezone.timedelta(days=7)
+        month_end = now.replace(day=1) + timezone.timedelta(days=32)
+        month_end = month_end.replace(day=1) - timezone.timedelta(days=1)
+        next_month = now.replace(day=1) + timezone.timedelta(days=32)
+        next_month = next_month.replace(day=1)
+        next_month_end = next_month + timezone.timedelta(days=32)
+        next_month_end = next_month_end.replace(day=1) - timezone.timedelta(days=1)
+        return {
+            'today': models.Q(date__date=now.date()),
+            'tomorrow': models.Q(date__date=tomorrow.date()),
+            'this_week': models.Q(date__gte=now, date__lte=week_end),
+            'this_month': models.Q(date__gte=now, date__lte=month_end),
+            'next_month': models.Q(date__gte=next_month, date__lte=next_month_end),
+        }
+
+    def facet_options(self):
+        """{facet: [(value, label, Q)]} for every selectable facet value"""
+        prices = self.price_filters()
+        dates = self.date_filters()
+        return {
+            'category': [(category.pk, category.name, models.Q(category=category))
+                         for category in self.fields['category'].queryset],
+            'price_range': [(value, label, prices[value]) for value, label in self.PRICE_CHOICES if value],
+            'date_range': [(value, label, dates[value]) for value, label in self.DATE_CHOICES if value],
+        }
+
+    def facet_filters(self):
+        """{facet: Q} for the facets selected in this search"""
+        filters = {}
+        if self.cleaned_data.get('category'):
+            filters['category'] = models.Q(category=self.cleaned_data['category'])
+        if self.cleaned_data.get('price_range'):
+            filters['price_range'] = self.price_filters()[self.cleaned_data['price_range']]
+        if self.cleaned_data.get('date_range'):
+            filters['date_range'] = self.date_filters()[self.cleaned_data['date_range']]
+        return filters
+
+    def filter_text(self, queryset, backend=None, ranked=True):
+        """Apply the keyword and location filters, the parts of a search that are not facets"""
         if self.cleaned_data.get('query'):
             query = self.cleaned_data['query']
-            queryset = queryset.filter(
-                models.Q(title__icontains=query) |
-                models.Q(description__icontains=query) |
-                models.Q(venue__name__icontains=query)
-            )
-        
-        if self.cleaned_data.get('category'):
-            queryset = queryset.filter(category=self.cleaned_data['category'])
-        
+            if search.use_index(backend):
+                if ranked:
+                    queryset = search.filter_ranked(queryset, query)
+                else:
+                    queryset = search.filter_matching(queryset, query)
+            else:
+                queryset = queryset.filter(
+                    models.Q(title__icontains=query) |
+                    models.Q(description__icontains=query) |
+                    models.Q(venue__name__icontains=query)
+                )
+
         if self.cleaned_data.get('location'):
             location = self.cleaned_data['location']
             queryset = queryset.filter(
                 models.Q(venue__city__icontains=location) |
                 models.Q(venue__name__icontains=location)
             )
-        
-        if self.cleaned_data.get('price_range'):
-            price_range = self.cleaned_data['price_range']
-            if price_range == '0-25':
-                queryset = queryset.filter(price__lte=25)
-            elif price_range == '25-50':
-                queryset = queryset.filter(price__gte=25, price__lte=50)
-            elif price_range == '50-100':
-                queryset = queryset.filter(price__gte=50, price__lte=100)
-            elif price_range == '100-200':
-                queryset = queryset.filter(price__gte=100, price__lte=200)
-            elif price_range == '200+':
-                queryset = queryset.filter(price__gte=200)
-        
-        if self.cleaned_data.get('date_range'):
-            date_range = self.cleaned_data['date_range']
-            now = timezone.now()
-            
-            if date_range == 'today':
-                queryset = queryset.filter(date__date=now.date())
-            elif date_range == 'tomorrow':
-                tomorrow = now + timezone.timedelta(days=1)
-                queryset = queryset.filter(date__date=tomorrow.date())
-            elif date_range == 'this_week':
-                week_end = now + timezone.timedelta(days=7)
-                queryset = queryset.filter(date__gte=now, date__lte=week_end)
-            elif date_range == 'this_month':
-                month_end = now.replace(day=1) + timezone.timedelta(days=32)
-                month_end = month_end.replace(day=1) - timezone.timedelta(days=1)
-                queryset = queryset.filter(date__gte=now, date__lte=month_end)
-            elif date_range == 'next_month':
-                next_month = now.replace(day=1) + timezone.timedelta(days=32)
-                next_month = next_month.replace(day=1)
-                month_end = next_month + timezone.timedelta(days=32)
-                month_end = month_end.replace(day=1) - timezone.timedelta(days=1)
-                queryset = queryset.filter(date__gte=next_month, date__lte=month_end)
-        
+
+        if self.uses_distance:
+            latitude, longitude = self.point
+            queryset = queryset.filter(venue__latitude__isnull=False, venue__longitude__isnull=False)
+            if self.cleaned_data.get('radius'):
+                radius = float(self.cleaned_data['radius'])
+                # Prune by geohash cell on the index before the exact distance check
+                queryset = queryset.filter(
+                    geo.cell_filter(latitude, longitude, radius, prefix='venue__'),
+                    geo.bounding_box_filter(latitude, longitude, radius, prefix='venue__')
+                )
+                queryset = queryset.annotate(distance=geo.distance_expression(latitude, longitude, 'venue__'))
+                queryset = queryset.filter(distance__lte=radius)
+            else:
+                queryset = queryset.annotate(distance=geo.distance_expression(latitude, longitude, 'venue__'))
         return queryset
 
+    def filter_events(self, queryset, backend=None):
+        """Apply filters to the event queryset, ranking text matches when the FTS index is used"""
+        queryset = self.filter_text(queryset, backend)
+        for facet_filter in self.facet_filters().values():
+            queryset = queryset.filter(facet_filter)
+
+        sort = self.cleaned_data.get('sort')
+        if sort == 'distance':
+            queryset = queryset.order_by('distance', 'date')
+        elif sort == 'date':
+            queryset = queryset.order_by('date')
+        return queryset
+
+    def facet_counts(self, queryset, backend=None):
+        """Count matching events for every category, price and date bucket in one aggregate query.
+
+        Each facet is counted with the filters of the other facets applied but
+        not its own, so the counts say how many results picking that value
+        instead would give. Returns {facet: [(value, label, count, selected)]}.
+        """
+        queryset = self.filter_text(queryset, backend, ranked=False).order_by()
+        selected = self.facet_filters()
+        options = self.facet_options()
+
+        aggregates = {}
+        for facet, values in options.items():
+            others = models.Q()
+            for other, other_filter in selected.items():
+                if other != facet:
+                    others &= other_filter
+            for position, (value, label, value_filter) in enumerate(values):
+                aggregates[f'{facet}_{position}'] = models.Count('pk', filter=value_filter & others)
+        counts = queryset.aggregate(**aggregates) if aggregates else {}
+
+        chosen = {
+            'category': getattr(self.cleaned_data.get('category'), 'pk', None),
+            'price_range': self.cleaned_data.get('price_range'),
+            'date_range': self.cleaned_data.get('date_range'),
+        }
+        return {
+            facet: [(value, label, counts[f'{facet}_{position}'], value == chosen[facet])
+                    for position, (value, label, value_filter) in enumerate(values)]
+            for facet, values in options.items()
+        }
+
 
 class EventForm(forms.ModelForm):
     class Meta:
@@ -141,7 +278,7 @@ class EventForm(forms.ModelForm):
 class VenueForm(forms.ModelForm):
     class Meta:
         model = Venue
-        fields = ['name', 'address', 'city', 'state', 'zip_code', 'capacity']
+        fields = ['name', 'address', 'city', 'state', 'zip_code', 'capacity', 'latitude', 'longitude']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'address': forms.TextInput(attrs={'class': 'form-control'}),
@@ -149,4 +286,6 @@ class VenueForm(forms.ModelForm):
             'state': forms.TextInput(attrs={'class': 'form-control'}),
             'zip_code': forms.TextInput(attrs={'class': 'form-control'}),
             'capacity': forms.NumberInput(attrs={'class': 'form-control'}),
+            'latitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
+            'longitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
         }
@@ -0,0 +1,124 @@
+"""
+Geohash cells for venue radius searches.
+
+Every venue with coordinates stores its 12-character geohash. A radius search
+picks the finest precision whose cells are at least as large as the radius,
+so the circle always fits in the 3x3 block of cells around the searcher. Those
+nine cells become indexed range conditions on Venue.geohash, and only the
+venues inside them get the exact great-circle distance check.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ACos, Cos, Least, Radians, Sin
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = 69.09
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Height and width of a cell in degrees"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def precision_for_radius(latitude, radius_miles):
+    """Finest precision whose cells are at least radius_miles across at this latitude"""
+    lng_scale = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height * MILES_PER_DEGREE >= radius_miles and width * MILES_PER_DEGREE * lng_scale >= radius_miles:
+            return precision
+    return 0
+
+
+def covering_cells(latitude, longitude, radius_miles):
+    """Geohash prefixes of the 3x3 block of cells around a point, covering the radius"""
+    precision = precision_for_radius(latitude, radius_miles)
+    if precision == 0:
+        return ['']
+    height, width = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            lat = min(max(latitude + lat_step * height, -90.0), 90.0 - 1e-9)
+            lng = (longitude + lng_step * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def cell_filter(latitude, longitude, radius_miles, prefix=''):
+    """Q object keeping venues whose geohash lies in one of the covering cells.
+
+    Each cell is a range on the geohash column rather than a startswith, so
+    databases with case-insensitive LIKE can still use the index.
+    """
+    condition = Q()
+    for cell in covering_cells(latitude, longitude, radius_miles):
+        if cell:
+            condition |= Q(**{f'{prefix}geohash__gte': cell, f'{prefix}geohash__lt': cell + '~'})
+        else:
+            condition |= Q(**{f'{prefix}geohash__gt': ''})
+    return condition
+
+
+def bounding_box_filter(latitude, longitude, radius_miles, prefix=''):
+    """Q object keeping venues inside the latitude/longitude box around the radius.
+
+    Cells at coarse precisions are much larger than the circle; this cheap
+    comparison drops most of their venues before distances are computed.
+    """
+    lat_delta = radius_miles / MILES_PER_DEGREE
+    condition = Q(**{
+        f'{prefix}latitude__gte': latitude - lat_delta,
+        f'{prefix}latitude__lte': latitude + lat_delta,
+    })
+    lng_scale = math.cos(math.radians(min(abs(latitude) + lat_delta, 90.0)))
+    if lng_scale > 0:
+        lng_delta = radius_miles / (MILES_PER_DEGREE * lng_scale)
+        if lng_delta < 180 and -180 <= longitude - lng_delta and longitude + lng_delta <= 180:
+            condition &= Q(**{
+                f'{prefix}longitude__gte': longitude - lng_delta,
+                f'{prefix}longitude__lte': longitude + lng_delta,
+            })
+    return condition
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """Great-circle distance in miles from a point to the venue, as a database expression"""
+    lat = math.radians(latitude)
+    venue_lat = Radians(F(f'{prefix}latitude'))
+    venue_lng = Radians(F(f'{prefix}longitude'))
+    cosine = (
+        Value(math.sin(lat)) * Sin(venue_lat)
+        + Value(math.cos(lat)) * Cos(venue_lat) * Cos(venue_lng - Value(math.radians(longitude)))
+    )
+    return Value(EARTH_RADIUS_MILES) * ACos(Least(cosine, Value(1.0), output_field=FloatField()))
+
@@ -0,0 +1,77 @@
+"""
+Precomputed homepage snapshot, served stale-while-revalidate.
+
+The snapshot (homepage categories with their event rails, and the featured
+events) is stored in the Django cache with the catalog version it was
+built from. A request that finds it outdated, because the catalog changed
+or it is older than HOME_SNAPSHOT_MAX_AGE, still serves it and starts one
+background rebuild; only a missing snapshot is built in the request. The
+hot path is one cache read and the catalog version query.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import Category, Event
+from .search_cache import catalog_version
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'events:home_snapshot'
+REBUILD_LOCK_KEY = 'events:home_snapshot:rebuilding'
+MAX_AGE = getattr(settings, 'HOME_SNAPSHOT_MAX_AGE', 300)
+RAIL_SIZE = 3
+FEATURED_SIZE = 6
+
+
+def build_snapshot():
+    """Query everything the homepage shows, returns the snapshot dict"""
+    version = catalog_version()
+    now = timezone.now()
+    categories = list(
+        Category.objects.filter(show_on_homepage=True)
+        .annotate(next_event=Min('event__date', filter=Q(event__is_active=True, event__date__gte=now)))
+        .order_by('homepage_order', 'name')
+    )
+    events = Event.objects.filter(is_active=True).select_related('venue', 'category')
+    rails = [(category, list(events.filter(category=category)[:RAIL_SIZE])) for category in categories]
+    snapshot = {
+        'version': version,
+        'built_at': time.time(),
+        'categories': [category for category, rail in rails],
+        'rails': [(category, rail) for category, rail in rails if rail],
+        'featured_events': list(events[:FEATURED_SIZE]),
+    }
+    cache.set(SNAPSHOT_KEY, snapshot, None)
+    return snapshot
+
+
+def _rebuild():
+    try:
+        build_snapshot()
+    except Exception:
+        logger.exception('Rebuilding the homepage snapshot failed')
+    finally:
+        cache.delete(REBUILD_LOCK_KEY)
+        connections.close_all()
+
+
+def rebuild_in_background():
+    """Start a rebuild unless one is already running somewhere"""
+    if cache.add(REBUILD_LOCK_KEY, True, 60):
+        threading.Thread(target=_rebuild, name='home-snapshot', daemon=True).start()
+
+
+def get_snapshot():
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return build_snapshot()
+    if snapshot['version'] != catalog_version() or time.time() - snapshot['built_at'] > MAX_AGE:
+        rebuild_in_background()
+    return snapshot
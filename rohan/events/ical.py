@@ -0,0 +1,118 @@
+"""
+iCalendar (RFC 5545) feeds, streamed.
+
+feed() is a generator over a queryset's iterator(), yielding the calendar
+a component at a time, so a feed with thousands of events never sits in
+memory as a whole. Personal feeds are addressed by a signed token instead
+of a login, because calendar clients poll without cookies. The token holds
+a random secret stored on the user's profile, so a leaked feed URL stops
+working once the user resets it.
+"""
+import secrets
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+from django.urls import reverse
+
+from accounts.models import UserProfile
+
+TOKEN_SALT = 'events.ical'
+# Events have no end time; clients show them as blocks this long
+EVENT_DURATION = 'PT2H'
+CHUNK_SIZE = 500
+
+
+def _feed_secret(user):
+    profile, created = UserProfile.objects.get_or_create(user=user)
+    if not profile.feed_secret:
+        # Of two requests racing here, the first one's secret is kept
+        UserProfile.objects.filter(pk=profile.pk, feed_secret='').update(feed_secret=secrets.token_urlsafe(16))
+        return UserProfile.objects.values_list('feed_secret', flat=True).get(pk=profile.pk)
+    return profile.feed_secret
+
+
+def user_token(user):
+    return signing.Signer(salt=TOKEN_SALT).sign(f'{user.pk}:{_feed_secret(user)}')
+
+
+def reset_user_token(user):
+    """Give the user a new feed secret, so that every feed URL issued before stops working"""
+    UserProfile.objects.get_or_create(user=user)
+    UserProfile.objects.filter(user=user).update(feed_secret=secrets.token_urlsafe(16))
+
+
+def user_id_for_token(token):
+    """The user id a token was made for, or None if it is not valid or was reset"""
+    try:
+        user_id, secret = signing.Signer(salt=TOKEN_SALT).unsign(token).split(':', 1)
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    if not UserProfile.objects.filter(user_id=user_id, feed_secret=secret).exclude(feed_secret='').exists():
+        return None
+    return user_id
+
+
+def escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into 75 octet pieces, as the RFC requires"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def event_component(event, request, uid, summary=None, note=''):
+    venue = event.venue
+    description = event.description + (f'\n\n{note}' if note else '')
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_datetime(event.updated_at)}',
+        f'LAST-MODIFIED:{format_datetime(event.updated_at)}',
+        f'DTSTART:{format_datetime(event.date)}',
+        f'DURATION:{EVENT_DURATION}',
+        f'SUMMARY:{escape(summary or event.title)}',
+        f'LOCATION:{escape(f"{venue.name}, {venue.address}, {venue.city}")}',
+        f'DESCRIPTION:{escape(description)}',
+        f'URL:{request.build_absolute_uri(reverse("events:event_detail", args=[event.pk]))}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def feed(request, name, items, component):
+    """Yield a calendar called name with component(item) for every item of the queryset"""
+    yield ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//EventSphere//Event feeds//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(name)}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+        'X-PUBLISHED-TTL:PT15M',
+    ])
+    for item in items.iterator(chunk_size=CHUNK_SIZE):
+        yield component(item)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,153 @@
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+REPLAY_WAIT = getattr(settings, 'IDEMPOTENCY_REPLAY_WAIT', 5)
+POLL_INTERVAL = 0.1
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'
+
+
+def _fingerprint(request, scope, args, kwargs):
+    data = request.POST.copy()
+    data.pop('csrfmiddlewaretoken', None)
+    data.pop(FIELD, None)
+    parts = [scope, repr(args), repr(sorted(kwargs.items())), repr(sorted(data.lists()))]
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def _claim(request, key, scope, fingerprint):
+    """Create the key record, or return the existing one for a duplicate request"""
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    scope=scope,
+                    request_fingerprint=fingerprint,
+                    expires_at=timezone.now() + timedelta(seconds=KEY_TTL)
+                )
+            return None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if existing is None:
+                continue
+            if existing.expires_at > timezone.now():
+                return existing
+            # Expired keys behave as if they had never been used
+            IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=timezone.now()).delete()
+    return None
+
+
+def _wait_for_response(record):
+    """Re-read the record until the first request stored its response, for up to REPLAY_WAIT seconds.
+
+    Returns None if the first request failed and gave the key up.
+    """
+    deadline = time.monotonic() + REPLAY_WAIT
+    while record is not None and record.response_status is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def _replay(request, record, scope, fingerprint, from_form):
+    """Response to a duplicate request.
+
+    API clients, which send the key as a header, get status codes they can
+    act on. A browser resubmitting a form (a double click or the back
+    button) is redirected instead, with a message when the outcome of the
+    first submission cannot be shown.
+    """
+    if record.scope != scope or record.request_fingerprint != fingerprint:
+        if not from_form:
+            return HttpResponse('Idempotency key was already used for a different request.', status=422)
+        messages.warning(request, 'This form was already submitted.')
+        return redirect(record.response_location or 'events:my_bookings')
+
+    record = _wait_for_response(record)
+    if record is None or record.response_status is None:
+        if not from_form:
+            response = HttpResponse('A request with this idempotency key is still in progress.', status=409)
+            response['Retry-After'] = '1'
+            return response
+        if record is None:
+            messages.error(request, 'Your earlier submission did not go through. Please try again.')
+        else:
+            messages.info(request, 'Your request is still being processed. Check your bookings in a moment.')
+        return redirect('events:my_bookings')
+
+    if record.response_location:
+        response = HttpResponseRedirect(record.response_location)
+        response.status_code = record.response_status
+    else:
+        response = HttpResponse(status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """Run a POST view at most once per idempotency key.
+
+    The key comes from the Idempotency-Key header or an idempotency_key form
+    field. A repeated request gets the stored redirect of the first one
+    instead of running the view again, waiting briefly if the first one is
+    still running; requests without a key are not affected. Only redirects
+    are stored, since that is what these views return after a successful
+    POST.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            from_form = not request.headers.get(HEADER)
+            key = request.headers.get(HEADER) or request.POST.get(FIELD)
+            if request.method != 'POST' or not key or not request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            key = key[:100]
+            fingerprint = _fingerprint(request, scope, args, kwargs)
+            existing = _claim(request, key, scope, fingerprint)
+            if existing is not None:
+                return _replay(request, existing, scope, fingerprint, from_form)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                IdempotencyKey.objects.filter(user=request.user, key=key).delete()
+                raise
+
+            if 300 <= response.status_code < 400 and response.has_header('Location'):
+                IdempotencyKey.objects.filter(user=request.user, key=key).update(
+                    response_status=response.status_code,
+                    response_location=response['Location'][:500]
+                )
+            else:
+                IdempotencyKey.objects.filter(user=request.user, key=key).delete()
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired keys in batches, returns the number deleted"""
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,205 @@
+"""
+Collision-free identifiers for booking references and ticket numbers.
+
+IDs are Crockford base32 with a trailing mod-37 check symbol. The allocator
+class is chosen with the ID_ALLOCATOR setting; both allocators need at most
+one database round trip per block of IDs, not per ID.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CHECK_ALPHABET = ALPHABET + '*~$=U'
+DECODE_MAP = {char: index for index, char in enumerate(ALPHABET)}
+# Characters people commonly mistype for the Crockford symbols
+DECODE_MAP.update({'O': 0, 'I': 1, 'L': 1})
+
+BLOCK_SIZE = getattr(settings, 'ID_BLOCK_SIZE', 1000)
+
+
+def encode(value, width):
+    chars = []
+    for _ in range(width):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    if value:
+        raise OverflowError(f'{width} base32 symbols are not enough for this value')
+    return ''.join(reversed(chars))
+
+
+def decode(code):
+    value = 0
+    for char in code.upper().replace('-', ''):
+        value = value * 32 + DECODE_MAP[char]
+    return value
+
+
+def format_id(value, width):
+    """Encode value as width symbols followed by its check symbol"""
+    return encode(value, width) + CHECK_ALPHABET[value % 37]
+
+
+def is_valid(code):
+    """Return True if the code's check symbol matches its value"""
+    code = code.upper().replace('-', '')
+    if len(code) < 2:
+        return False
+    try:
+        value = decode(code[:-1])
+    except KeyError:
+        return False
+    return CHECK_ALPHABET[value % 37] == code[-1]
+
+
+def reserve_block(namespace, size):
+    """Reserve size consecutive values of a sequence, returns the first one"""
+    from .models import IdSequence
+    IdSequence.objects.get_or_create(namespace=namespace)
+    with transaction.atomic():
+        # The UPDATE locks the sequence row until commit, so the value read
+        # back below belongs to this block alone
+        IdSequence.objects.filter(namespace=namespace).update(next_value=F('next_value') + size)
+        end = IdSequence.objects.values_list('next_value', flat=True).get(namespace=namespace)
+    return end - size
+
+
+def _track_reservation(state):
+    """Remember whether the reservation just made can still be rolled back.
+
+    A block reserved inside a transaction (e.g. while saving a Booking) is
+    given back to the sequence if that transaction rolls back, so it may only
+    be kept once the transaction commits. Connections start a new list of
+    on_commit hooks whenever a transaction ends or a savepoint is rolled back,
+    which is how an unconfirmed reservation is detected later on.
+    """
+    state.pid = os.getpid()
+    state.pending = None
+    if connection.in_atomic_block:
+        state.pending = connection.run_on_commit
+
+        def confirm():
+            state.pending = None
+        transaction.on_commit(confirm)
+
+
+def _reservation_valid(state):
+    if getattr(state, 'pid', None) != os.getpid():
+        # A forked worker must never reuse the reservation of its parent
+        return False
+    return state.pending is None or state.pending is connection.run_on_commit
+
+
+class SequenceBlockAllocator:
+    """Hands out per-thread blocks of sequence values, scrambled into IDs.
+
+    Values are passed through a keyed permutation of 40 bits before
+    encoding: a Feistel network whose round function is an HMAC keyed from
+    SECRET_KEY and the namespace. Uniqueness is preserved, and without the
+    key one ID does not reveal the IDs issued before or after it. IDs are 8
+    symbols plus a check symbol.
+    """
+    WIDTH = 8
+    BITS = WIDTH * 5
+    ROUNDS = 4
+
+    def __init__(self, namespace, block_size=BLOCK_SIZE):
+        self.namespace = namespace
+        self.block_size = block_size
+        self.half_bits = self.BITS // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.hmac = salted_hmac(f'events.ids.{namespace}', b'', algorithm='sha256')
+        self.local = threading.local()
+
+    def next_value(self):
+        state = self.local
+        if not _reservation_valid(state) or state.next_value >= state.limit:
+            state.next_value = reserve_block(self.namespace, self.block_size)
+            state.limit = state.next_value + self.block_size
+            _track_reservation(state)
+        value = state.next_value
+        state.next_value += 1
+        return value
+
+    def _round(self, number, half):
+        mac = self.hmac.copy()
+        mac.update(f'{number}:{half}'.encode())
+        digest = mac.digest()
+        return int.from_bytes(digest[:8], 'big') & self.half_mask
+
+    def scramble(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for number in range(self.ROUNDS):
+            left, right = right, left ^ self._round(number, right)
+        return (left << self.half_bits) | right
+
+    def next_id(self):
+        return format_id(self.scramble(self.next_value()), self.WIDTH)
+
+
+class TimeBasedAllocator:
+    """63-bit IDs: 41 bits of milliseconds, 16 bits of node, 6 bits of counter.
+
+    Every thread reserves its own node number from the shared 'id-node'
+    sequence, so concurrent threads and processes never share a node; node
+    numbers only repeat after 65536 reservations. IDs sort by creation time
+    and are 13 symbols plus a check symbol.
+    """
+    WIDTH = 13
+    EPOCH_MS = 1704067200000  # 2024-01-01 UTC
+
+    def __init__(self, namespace, block_size=None):
+        self.namespace = namespace
+        self.local = threading.local()
+
+    def now_ms(self):
+        return int(time.time() * 1000) - self.EPOCH_MS
+
+    def next_id(self):
+        state = self.local
+        if not _reservation_valid(state):
+            state.node = reserve_block('id-node', 1) % 65536
+            state.last_ms = -1
+            state.counter = 0
+            _track_reservation(state)
+
+        # Never go back in time, even if the system clock does
+        now_ms = max(self.now_ms(), state.last_ms)
+        if now_ms == state.last_ms:
+            state.counter += 1
+            if state.counter >= 64:
+                while now_ms <= state.last_ms:
+                    now_ms = self.now_ms()
+                state.counter = 0
+        else:
+            state.counter = 0
+        state.last_ms = now_ms
+        return format_id((now_ms << 22) | (state.node << 6) | state.counter, self.WIDTH)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator(namespace):
+    allocator = _allocators.get(namespace)
+    if allocator is None:
+        with _allocators_lock:
+            allocator = _allocators.get(namespace)
+            if allocator is None:
+                allocator_class = import_string(
+                    getattr(settings, 'ID_ALLOCATOR', 'events.ids.SequenceBlockAllocator')
+                )
+                allocator = _allocators[namespace] = allocator_class(namespace)
+    return allocator
+
+
+def next_id(namespace):
+    """Return a new unique ID for the namespace, e.g. 'booking' or 'ticket'"""
+    return get_allocator(namespace).next_id()
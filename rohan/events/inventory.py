@@ -0,0 +1,206 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Event, Booking
+from .seatmap import SectionBusy, assign_seats, release_assigned_seats
+from .signals import booking_status_changed
+
+HOLD_MINUTES = getattr(settings, 'BOOKING_HOLD_MINUTES', 10)
+# Bookings whose seats are taken from the remaining counter
+SEAT_HOLDING_STATUSES = ['pending', 'confirmed', 'completed']
+
+
+def reserve_seats(event, quantity):
+    """Take seats from the event's remaining counter, returns False when sold out.
+
+    The check and the decrement happen in a single conditional UPDATE, so
+    concurrent bookings can never push the counter below zero and only the
+    event's own row is locked.
+    """
+    if event.seats_remaining is None:
+        return True
+
+    reserved = Event.objects.filter(
+        pk=event.pk,
+        seats_remaining__gte=quantity
+    ).update(seats_remaining=F('seats_remaining') - quantity)
+    return reserved == 1
+
+
+def release_seats(event, quantity):
+    """Give seats back to the event's remaining counter"""
+    _release_seats(event.pk, quantity)
+
+
+def _release_seats(event_id, quantity):
+    Event.objects.filter(
+        pk=event_id,
+        seats_remaining__isnull=False
+    ).update(seats_remaining=F('seats_remaining') + quantity)
+
+
+def recount_seats(event):
+    """Recompute the remaining counter from the venue capacity, e.g. after the event moved venue.
+
+    The seats held by bookings are summed in the UPDATE itself, so a booking
+    made at the same time is either counted or sees the new counter.
+    """
+    if event.venue.capacity <= 0:
+        remaining = None
+    else:
+        held = (
+            Booking.objects.filter(event=OuterRef('pk'), status__in=SEAT_HOLDING_STATUSES)
+            .values('event').annotate(seats=Sum('quantity')).values('seats')
+        )
+        remaining = Greatest(Value(event.venue.capacity) - Coalesce(Subquery(held), 0), 0)
+    Event.objects.filter(pk=event.pk).update(seats_remaining=remaining)
+    event.refresh_from_db(fields=['seats_remaining'])
+
+
+def release_booking(booking, from_status='confirmed', to_status='cancelled'):
+    """Move a booking out of from_status and return its seats.
+
+    Returns False if another request already changed the booking, in which
+    case the seats have already been given back and nothing is done. Raises
+    seatmap.SectionBusy when assigned seats could not be freed; run it in a
+    transaction so the status change is rolled back with them.
+    """
+    released = Booking.objects.filter(
+        pk=booking.pk,
+        status=from_status
+    ).update(status=to_status, updated_at=timezone.now())
+
+    if not released:
+        return False
+
+    release_seats(booking.event, booking.quantity)
+    if booking.seats:
+        release_assigned_seats([(booking.event_id, booking.section_id, booking.seats)])
+    booking.status = to_status
+    _status_changed(booking.pk, booking.user_id, booking.total_amount, from_status, to_status)
+    return True
+
+
+def hold_seats(user, event, quantity, section=None):
+    """Reserve seats as a pending booking that expires after HOLD_MINUTES.
+
+    For reserved seating, the best available seats of the section are
+    assigned as well. Returns None when the event (or section) does not have
+    enough seats left, even after reclaiming its expired holds.
+    """
+    with transaction.atomic():
+        reserved = reserve_seats(event, quantity)
+        if not reserved and release_expired_holds(event=event):
+            reserved = reserve_seats(event, quantity)
+        if not reserved:
+            return None
+
+        seats = []
+        if section is not None:
+            seats = assign_seats(event, section, quantity)
+            if seats is None and release_expired_holds(event=event):
+                seats = assign_seats(event, section, quantity)
+            if seats is None:
+                # Undo the counter reservation made above
+                transaction.set_rollback(True)
+                return None
+
+        return Booking.objects.create(
+            user=user,
+            event=event,
+            quantity=quantity,
+            total_amount=event.price * quantity,
+            status='pending',
+            section=section,
+            seats=seats,
+            expires_at=timezone.now() + timedelta(minutes=HOLD_MINUTES)
+        )
+
+
+def confirm_hold(booking):
+    """Turn an unexpired hold into a confirmed booking, returns False if it expired"""
+    now = timezone.now()
+    confirmed = Booking.objects.filter(
+        pk=booking.pk,
+        status='pending',
+        expires_at__gt=now
+    ).update(status='confirmed', expires_at=None, updated_at=now)
+
+    if confirmed:
+        booking.status = 'confirmed'
+        booking.expires_at = None
+        _status_changed(booking.pk, booking.user_id, booking.total_amount, 'pending', 'confirmed')
+    return confirmed == 1
+
+
+def _status_changed(booking_id, user_id, total_amount, from_status, to_status):
+    booking_status_changed.send(
+        sender=Booking, booking_id=booking_id, user_id=user_id, total_amount=total_amount,
+        from_status=from_status, to_status=to_status,
+    )
+
+
+def release_expired_holds(event=None, batch_size=500):
+    """Expire pending bookings whose hold ran out and return their seats.
+
+    Holds are read oldest first through the (status, expires_at) index in
+    batches, and each batch is expired with one UPDATE and one seat release
+    per event. Returns the number of holds released.
+    """
+    now = timezone.now()
+    released = 0
+
+    while True:
+        holds = Booking.objects.filter(status='pending', expires_at__lte=now)
+        if event is not None:
+            holds = holds.filter(event=event)
+        batch = list(holds.order_by('expires_at').values_list(
+            'id', 'event_id', 'quantity', 'section_id', 'seats', 'user_id', 'total_amount'
+        )[:batch_size])
+        if not batch:
+            break
+
+        by_event = defaultdict(list)
+        for row in batch:
+            by_event[row[1]].append(row)
+
+        swept = 0
+        try:
+            with transaction.atomic():
+                for event_id, rows in by_event.items():
+                    booking_ids = [row[0] for row in rows]
+                    expired = Booking.objects.filter(
+                        pk__in=booking_ids,
+                        status='pending'
+                    ).update(status='expired', updated_at=now)
+
+                    if expired != len(rows):
+                        # Some holds changed concurrently; only return the seats of
+                        # the ones this sweep expired
+                        mine = set(Booking.objects.filter(
+                            pk__in=booking_ids,
+                            status='expired',
+                            updated_at=now
+                        ).values_list('id', flat=True))
+                        rows = [row for row in rows if row[0] in mine]
+
+                    if rows:
+                        _release_seats(event_id, sum(row[2] for row in rows))
+                        release_assigned_seats((event_id, row[3], row[4]) for row in rows)
+                    for row in rows:
+                        _status_changed(row[0], row[5], row[6], 'pending', 'expired')
+                    swept += len(rows)
+        except SectionBusy:
+            # The batch was rolled back; a later sweep releases these holds
+            break
+        released += swept
+
+        if len(batch) < batch_size:
+            break
+
+    return released
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from events.models import Category, Venue, Event
+from events.models import Category, Venue, Section, Event
 from django.contrib.auth.models import User
 
 
@@ -13,9 +13,12 @@ class Command(BaseCommand):
         
         # Create categories
         categories_data = [
-            {'name': 'Concert', 'slug': 'concert', 'description': 'Live music performances'},
-            {'name': 'Festival', 'slug': 'festival', 'description': 'Music and cultural festivals'},
-            {'name': 'Sports', 'slug': 'sports', 'description': 'Sporting events and competitions'},
+            {'name': 'Concert', 'slug': 'concert', 'description': 'Live music performances',
+             'show_on_homepage': True, 'homepage_order': 1},
+            {'name': 'Festival', 'slug': 'festival', 'description': 'Music and cultural festivals',
+             'show_on_homepage': True, 'homepage_order': 2},
+            {'name': 'Sports', 'slug': 'sports', 'description': 'Sporting events and competitions',
+             'show_on_homepage': True, 'homepage_order': 3},
         ]
         
         for cat_data in categories_data:
@@ -34,7 +37,9 @@ class Command(BaseCommand):
                 'city': 'New York',
                 'state': 'NY',
                 'zip_code': '10001',
-                'capacity': 20000
+                'capacity': 20000,
+                'latitude': 40.7505,
+                'longitude': -73.9934
             },
             {
                 'name': 'Hollywood Bowl',
@@ -42,7 +47,9 @@ class Command(BaseCommand):
                 'city': 'Los Angeles',
                 'state': 'CA',
                 'zip_code': '90068',
-                'capacity': 17500
+                'capacity': 17500,
+                'latitude': 34.1122,
+                'longitude': -118.3392
             },
             {
                 'name': 'Red Rocks Amphitheatre',
@@ -50,7 +57,9 @@ class Command(BaseCommand):
                 'city': 'Morrison',
                 'state': 'CO',
                 'zip_code': '80465',
-                'capacity': 9525
+                'capacity': 9525,
+                'latitude': 39.6655,
+                'longitude': -105.2057
             },
             {
                 'name': 'Fenway Park',
@@ -58,7 +67,9 @@ class Command(BaseCommand):
                 'city': 'Boston',
                 'state': 'MA',
                 'zip_code': '02215',
-                'capacity': 37755
+                'capacity': 37755,
+                'latitude': 42.3467,
+                'longitude': -71.0972
             },
         ]
         
@@ -70,6 +81,28 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'Created venue: {venue.name}')
         
+        # Create reserved seating sections
+        sections_data = {
+            'Fenway Park': [
+                {'name': 'Field Box', 'rows': 30, 'seats_per_row': 250, 'position': 0},
+                {'name': 'Loge Box', 'rows': 25, 'seats_per_row': 240, 'position': 1},
+                {'name': 'Grandstand', 'rows': 40, 'seats_per_row': 320, 'position': 2},
+                {'name': 'Pavilion', 'rows': 11, 'seats_per_row': 223, 'position': 3},
+                {'name': 'Bleachers', 'rows': 30, 'seats_per_row': 300, 'position': 4},
+            ],
+        }
+
+        for venue_name, sections in sections_data.items():
+            venue = Venue.objects.get(name=venue_name)
+            for section_data in sections:
+                section, created = Section.objects.get_or_create(
+                    venue=venue,
+                    name=section_data['name'],
+                    defaults=section_data
+                )
+                if created:
+                    self.stdout.write(f'Created section: {venue.name} - {section.name}')
+
         # Create events
         concert_category = Category.objects.get(slug='concert')
         festival_category = Category.objects.get(slug='festival')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from events.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency key(s).'))
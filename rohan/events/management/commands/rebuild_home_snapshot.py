@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from events.homepage import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached homepage snapshot'
+
+    def handle(self, *args, **options):
+        snapshot = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Homepage snapshot rebuilt with {len(snapshot['categories'])} categories "
+            f"and {len(snapshot['featured_events'])} featured events."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from events import ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute event rating summaries from the reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help='Only these events (default: all)')
+
+    def handle(self, *args, **options):
+        count = ratings.rebuild(options['event_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rating summaries.'))
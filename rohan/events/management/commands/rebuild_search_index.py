@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from events import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for events'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('The full-text search index is not available on this database.')
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from events import search_cache, search_log
+from events.forms import EventSearchForm
+from events.models import Event
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def run(form, scope, backend):
+    """Repeat the work the logged search did, returns the result count"""
+    if scope == 'dashboard':
+        return len(list(form.filter_events(Event.objects.filter(is_active=True), backend)[:5]))
+    return len(search_cache.run_search(form, backend)[0])
+
+
+class Command(BaseCommand):
+    help = 'Replay a captured search log against this database and report latency percentiles per query shape'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Search log written by events.search_log')
+        parser.add_argument('--repeat', type=int, default=1, help='Run every logged search this many times')
+        parser.add_argument('--limit', type=int, default=None, help='Only replay the first N searches')
+        parser.add_argument('--backend', choices=['fts', 'icontains'], default=None,
+                            help='Search backend to benchmark (default: EVENT_SEARCH_BACKEND)')
+
+    def handle(self, *args, **options):
+        try:
+            entries = list(search_log.read(options['path']))
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+        if options['limit']:
+            entries = entries[:options['limit']]
+        if not entries:
+            raise CommandError('The log has no searches to replay.')
+
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        timings = {}
+        skipped = 0
+        with connection.execute_wrapper(count_queries):
+            for entry in entries:
+                scope = entry.get('s', 'search')
+                form = EventSearchForm(entry['p'])
+                if not form.is_valid():
+                    skipped += 1
+                    continue
+                shape = search_log.shape(entry['p'], scope)
+                for _ in range(options['repeat']):
+                    queries = 0
+                    started = time.perf_counter()
+                    results = run(form, scope, options['backend'])
+                    elapsed = (time.perf_counter() - started) * 1000
+                    timings.setdefault(shape, []).append((elapsed, queries, results))
+
+        header = f"{'shape':<48} {'runs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sql':>5} {'rows':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        everything = []
+        for shape, runs in sorted(timings.items(), key=lambda item: -len(item[1])):
+            latencies = sorted(elapsed for elapsed, sql, rows in runs)
+            everything.extend(latencies)
+            self.stdout.write(
+                f'{shape:<48} {len(runs):>6} {percentile(latencies, 0.50):>9.2f} '
+                f'{percentile(latencies, 0.95):>9.2f} {percentile(latencies, 0.99):>9.2f} '
+                f'{sum(sql for elapsed, sql, rows in runs) / len(runs):>5.1f} '
+                f'{sum(rows for elapsed, sql, rows in runs) / len(runs):>7.1f}'
+            )
+        everything.sort()
+        if everything:
+            self.stdout.write('-' * len(header))
+            self.stdout.write(
+                f"{'all':<48} {len(everything):>6} {percentile(everything, 0.50):>9.2f} "
+                f"{percentile(everything, 0.95):>9.2f} {percentile(everything, 0.99):>9.2f}"
+            )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {skipped} search(es) that no longer validate.'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:29
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_seats_remaining(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Booking = apps.get_model('events', 'Booking')
+
+    for event in Event.objects.select_related('venue').filter(venue__capacity__gt=0):
+        sold = Booking.objects.filter(event=event).exclude(status='cancelled').aggregate(
+            total=Sum('quantity')
+        )['total'] or 0
+        event.seats_remaining = max(event.venue.capacity - sold, 0)
+        event.save(update_fields=['seats_remaining'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_created_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_remaining',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_seats_remaining, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_seats_remaining'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitingRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_enabled', models.BooleanField(default=True)),
+                ('admission_rate', models.PositiveIntegerField(default=100, help_text='Users let through per minute')),
+                ('opens_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('issued_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('next_admission_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waiting_room', to='events.event')),
+            ],
+        ),
+    ]
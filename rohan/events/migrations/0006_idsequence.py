@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_waitingroom'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
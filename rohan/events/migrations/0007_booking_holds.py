@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def confirm_existing_bookings(apps, schema_editor):
+    # Bookings made before holds existed were never given a status, yet
+    # their tickets are issued and their seats counted as sold
+    Booking = apps.get_model('events', 'Booking')
+    Booking.objects.filter(status='pending', expires_at__isnull=True).update(status='confirmed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_idsequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('expired', 'Expired'), ('completed', 'Completed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'expires_at'], name='events_book_status_af0a86_idx'),
+        ),
+        migrations.RunPython(confirm_existing_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_booking_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='seats',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='seat_label',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rows', models.PositiveIntegerField()),
+                ('seats_per_row', models.PositiveIntegerField()),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='events.venue')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'unique_together': {('venue', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='section',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='events.section'),
+        ),
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken', models.BinaryField()),
+                ('remaining', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_inventories', to='events.event')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='events.section')),
+            ],
+            options={
+                'unique_together': {('event', 'section')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:12
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS events_event_fts USING fts5("
+            "title, description, venue_name, city, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5: searches fall back to icontains
+        return
+    schema_editor.execute(
+        "INSERT INTO events_event_fts (rowid, title, description, venue_name, city) "
+        "SELECT e.id, e.title, e.description, v.name, v.city "
+        "FROM events_event e JOIN events_venue v ON v.id = e.venue_id"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS events_event_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
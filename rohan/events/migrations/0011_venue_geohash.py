@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_venue_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'id'], name='events_even_date_2f23b7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', 'date', 'id'], name='events_even_categor_c5b422_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+def show_default_categories(apps, schema_editor):
+    # The homepage used to hard-code these three categories
+    Category = apps.get_model('events', 'Category')
+    for order, slug in enumerate(['concert', 'festival', 'sports'], start=1):
+        Category.objects.filter(slug=slug).update(show_on_homepage=True, homepage_order=order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='homepage_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='show_on_homepage',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(show_default_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def summarize_reviews(apps, schema_editor):
+    Review = apps.get_model('events', 'Review')
+    EventRatingSummary = apps.get_model('events', 'EventRatingSummary')
+    rows = Review.objects.values('event_id').annotate(
+        review_count=Count('id'),
+        rating_total=Sum('rating'),
+        **{f'rated_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    EventRatingSummary.objects.bulk_create([
+        EventRatingSummary(
+            event_id=row['event_id'],
+            count=row['review_count'],
+            total=row['rating_total'],
+            **{f'stars_{stars}': row[f'rated_{stars}'] for stars in range(1, 6)},
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_category_homepage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_summary', to='events.event')),
+            ],
+            options={
+                'verbose_name_plural': 'Event rating summaries',
+            },
+        ),
+        migrations.RunPython(summarize_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_rating_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['event', 'created_at', 'id'], name='events_revi_event_i_d7b2f8_idx'),
+        ),
+    ]
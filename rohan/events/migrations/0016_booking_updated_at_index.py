@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_review_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='events_book_updated_af955b_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
+from . import geo
 
 
 class Category(models.Model):
@@ -9,6 +10,9 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    # Homepage category cards and event rails, lowest homepage_order first
+    show_on_homepage = models.BooleanField(default=False)
+    homepage_order = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -24,10 +28,45 @@ class Venue(models.Model):
     state = models.CharField(max_length=100)
     zip_code = models.CharField(max_length=20)
     capacity = models.IntegerField(default=0)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Derived from the coordinates, indexed for radius searches (see events/geo.py)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+
+class Section(models.Model):
+    """Block of reserved seating in a venue, laid out as rows of equal length"""
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='sections')
+    name = models.CharField(max_length=100)
+    rows = models.PositiveIntegerField()
+    seats_per_row = models.PositiveIntegerField()
+    # Sections with a lower position are offered first as the best seats
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'id']
+        unique_together = ('venue', 'name')
+
+    def __str__(self):
+        return f"{self.venue.name} - {self.name}"
+
+    @property
+    def capacity(self):
+        return self.rows * self.seats_per_row
+
 
 class Event(models.Model):
     title = models.CharField(max_length=200)
@@ -41,9 +80,17 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Remaining sellable seats; NULL means the venue has no capacity limit.
+    # Only ever changed through events.inventory with conditional UPDATEs.
+    seats_remaining = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['date']
+        indexes = [
+            # Keyset pagination of event listings
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['category', 'date', 'id']),
+        ]
 
     def __str__(self):
         return self.title
@@ -55,6 +102,69 @@ class Event(models.Model):
     def is_upcoming(self):
         return self.date > timezone.now()
 
+    def save(self, *args, **kwargs):
+        venue_changed = False
+        if self._state.adding:
+            if self.seats_remaining is None and self.venue.capacity > 0:
+                self.seats_remaining = self.venue.capacity
+        else:
+            venue_changed = Event.objects.filter(pk=self.pk).exclude(venue_id=self.venue_id).exists()
+            if kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+                # The in-memory counter may be stale; only events.inventory writes it
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'seats_remaining'
+                ]
+        super().save(*args, **kwargs)
+        if venue_changed:
+            # Seats left depend on the new venue's capacity
+            from .inventory import recount_seats
+            recount_seats(self)
+
+
+class SeatInventory(models.Model):
+    """Seat availability of one section for one event, one bit per seat.
+
+    Bits are stored row-major in a BinaryField (a set bit is a taken seat),
+    so a 40,000 seat stadium needs 5KB per event instead of 40,000 rows.
+    Writes go through events.seatmap with a version check.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='seat_inventories')
+    section = models.ForeignKey(Section, on_delete=models.CASCADE)
+    taken = models.BinaryField()
+    remaining = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('event', 'section')
+
+    def __str__(self):
+        return f"{self.event.title} - {self.section.name}"
+
+
+class WaitingRoom(models.Model):
+    """Opt-in admission queue in front of book_event for high-demand on-sales"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='waiting_room')
+    is_enabled = models.BooleanField(default=True)
+    admission_rate = models.PositiveIntegerField(default=100, help_text='Users let through per minute')
+    opens_at = models.DateTimeField(default=timezone.now)
+    issued_count = models.PositiveIntegerField(default=0, editable=False)
+    # Admission time handed to the next user who joins the queue
+    next_admission_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"Waiting room for {self.event.title}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .waiting_room import forget_room
+        forget_room(self.event_id)
+
+    def delete(self, *args, **kwargs):
+        from .waiting_room import forget_room
+        forget_room(self.event_id)
+        return super().delete(*args, **kwargs)
+
 
 class UserFavorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -85,16 +195,56 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            # Keyset pagination of an event's reviews, newest first
+            models.Index(fields=['event', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.event.title} - {self.rating} stars"
 
 
+class EventRatingSummary(models.Model):
+    """Review count, rating total and star histogram of an event.
+
+    Kept up to date with F() updates by events.ratings, so pages can show
+    ratings without aggregating reviews; rebuild_rating_summaries repairs drift.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='rating_summary')
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Event rating summaries"
+
+    def __str__(self):
+        return f"Ratings for {self.event.title}"
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def histogram(self):
+        """(stars, count, percent) from five stars down"""
+        return [
+            (stars, getattr(self, f'stars_{stars}'),
+             round(100 * getattr(self, f'stars_{stars}') / self.count) if self.count else 0)
+            for stars in range(5, 0, -1)
+        ]
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
         ('completed', 'Completed'),
     ]
 
@@ -104,27 +254,43 @@ class Booking(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     booking_reference = models.CharField(max_length=20, unique=True)
+    # Reserved seating: the section and the [row, seat] pairs assigned to it
+    section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True)
+    seats = models.JSONField(default=list, blank=True)
+    # Until when a pending booking holds its seats
+    expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Lets the hold sweeper read expired holds oldest first
+            models.Index(fields=['status', 'expires_at']),
+            # Lets the sales rollups find bookings changed since their watermark
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_reference} - {self.event.title}"
 
     def save(self, *args, **kwargs):
         if not self.booking_reference:
-            import uuid
-            self.booking_reference = str(uuid.uuid4())[:8].upper()
+            from .ids import next_id
+            self.booking_reference = next_id('booking')
         if not self.total_amount:
             self.total_amount = self.event.price * self.quantity
         super().save(*args, **kwargs)
 
+    @property
+    def is_hold_active(self):
+        return self.status == 'pending' and self.expires_at is not None and self.expires_at > timezone.now()
+
 
 class Ticket(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='tickets')
     ticket_number = models.CharField(max_length=20, unique=True)
+    seat_label = models.CharField(max_length=100, blank=True)
     is_used = models.BooleanField(default=False)
     used_at = models.DateTimeField(null=True, blank=True)
 
@@ -133,6 +299,42 @@ class Ticket(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.ticket_number:
-            import uuid
-            self.ticket_number = f"TKT-{str(uuid.uuid4())[:8].upper()}"
+            self.ticket_number = self.generate_ticket_number()
         super().save(*args, **kwargs)
+
+    @staticmethod
+    def generate_ticket_number():
+        from .ids import next_id
+        return f"TKT-{next_id('ticket')}"
+
+
+class IdSequence(models.Model):
+    """Counter per namespace: blocks for events.ids allocators and the catalog version"""
+    namespace = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace}: {self.next_value}"
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a POST made with a client-supplied idempotency key.
+
+    A row is created before the view runs, so concurrent duplicates find it
+    and never run the view twice; response_status stays NULL until the first
+    request finishes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=100)
+    scope = models.CharField(max_length=50)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_location = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.user.username})"
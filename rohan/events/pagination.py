@@ -0,0 +1,144 @@
+"""
+Keyset pagination: every page continues from the last row shown instead of
+skipping OFFSET rows, so page 500 costs one indexed range scan just like
+page 1, and no COUNT(*) is needed to render it.
+
+KeysetPage offers the parts of django.core.paginator.Page the templates
+use. The 'page numbers' it hands out for the previous and next links are
+opaque signed cursor tokens, so ?page={{ page_obj.next_page_number }}
+keeps working unchanged.
+"""
+from collections.abc import Sequence
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'events.pagination'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering):
+        """ordering lists the sort fields, ending with a unique one, e.g. ('date', 'id')"""
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.page_range = []
+
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    def _order_by(self, reverse=False):
+        return [
+            f'-{name}' if descending != reverse else name
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse=False):
+        """Q object for rows that sort after values (or before them, when reverse)"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _cursor(self, obj, direction, number):
+        values = [getattr(obj, name) for name, descending in self.ordering]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return signing.dumps({'v': values, 'd': direction, 'n': number}, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, token):
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            fields = self.queryset.model._meta
+            values = [fields.get_field(name).to_python(value)
+                      for (name, descending), value in zip(self.ordering, data['v'])]
+            return values, data['d'], max(int(data['n']), 1)
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+
+    def page(self, token=None):
+        if not token:
+            rows = list(self.queryset.order_by(*self._order_by())[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], 1, has_next=len(rows) > self.per_page,
+                              has_previous=False)
+
+        values, direction, number = self._decode(token)
+        if direction == 'p':
+            rows = list(
+                self.queryset.filter(self._after(values, reverse=True))
+                .order_by(*self._order_by(reverse=True))[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(self, rows, number, has_next=True, has_previous=has_previous and number > 1)
+
+        rows = list(self.queryset.filter(self._after(values)).order_by(*self._order_by())[:self.per_page + 1])
+        return KeysetPage(self, rows[:self.per_page], number, has_next=len(rows) > self.per_page,
+                          has_previous=True)
+
+    def get_page(self, token=None):
+        """Like Paginator.get_page: a bad cursor gives the first page"""
+        try:
+            page = self.page(token)
+        except InvalidCursor:
+            page = self.page()
+        self.page_range = [page.number]
+        return page
+
+
+class KeysetPage(Sequence):
+    def __init__(self, paginator, object_list, number, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __repr__(self):
+        return f'<Keyset page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.paginator._cursor(self.object_list[-1], 'n', self.number + 1)
+
+    def previous_page_number(self):
+        if self.number <= 2:
+            return ''
+        return self.paginator._cursor(self.object_list[0], 'p', self.number - 1)
+
+
+def paginate(request, queryset, per_page, ordering, param='page'):
+    """Return the requested page of queryset, paginated by keyset over ordering.
+
+    Plain page numbers from links made before keyset pagination still work,
+    through a regular Paginator.
+    """
+    token = request.GET.get(param)
+    if token and token.isdigit():
+        if int(token) > 1:
+            return Paginator(queryset.order_by(*ordering), per_page).get_page(token)
+        token = None
+    return KeysetPaginator(queryset, per_page, ordering).get_page(token)
@@ -0,0 +1,71 @@
+"""
+Maintenance of EventRatingSummary rows.
+
+Every change is a single UPDATE with F() expressions on the event's summary
+row, so concurrent reviews never overwrite each other's counts. The row is
+created by the first review of an event.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import EventRatingSummary, Review
+
+STARS = range(1, 6)
+
+
+def _changes(rating, delta):
+    return {
+        'count': F('count') + delta,
+        'total': F('total') + delta * rating,
+        f'stars_{rating}': F(f'stars_{rating}') + delta,
+    }
+
+
+def review_added(event_id, rating):
+    changes = _changes(rating, 1)
+    if not EventRatingSummary.objects.filter(event_id=event_id).update(**changes):
+        EventRatingSummary.objects.get_or_create(event_id=event_id)
+        EventRatingSummary.objects.filter(event_id=event_id).update(**changes)
+
+
+def review_changed(event_id, old_rating, new_rating):
+    if old_rating == new_rating:
+        return
+    EventRatingSummary.objects.filter(event_id=event_id).update(
+        total=F('total') + new_rating - old_rating,
+        **{
+            f'stars_{old_rating}': F(f'stars_{old_rating}') - 1,
+            f'stars_{new_rating}': F(f'stars_{new_rating}') + 1,
+        },
+    )
+
+
+def review_removed(event_id, rating):
+    EventRatingSummary.objects.filter(event_id=event_id, count__gt=0).update(**_changes(rating, -1))
+
+
+def rebuild(event_ids=None):
+    """Recompute summaries from the reviews, returns the number of summaries written"""
+    reviews = Review.objects.all()
+    summaries = EventRatingSummary.objects.all()
+    if event_ids is not None:
+        reviews = reviews.filter(event_id__in=event_ids)
+        summaries = summaries.filter(event_id__in=event_ids)
+    rows = reviews.values('event_id').annotate(
+        review_count=Count('id'),
+        rating_total=Sum('rating'),
+        **{f'rated_{stars}': Count('id', filter=Q(rating=stars)) for stars in STARS},
+    )
+    with transaction.atomic():
+        rebuilt = [
+            EventRatingSummary(
+                event_id=row['event_id'],
+                count=row['review_count'],
+                total=row['rating_total'],
+                **{f'stars_{stars}': row[f'rated_{stars}'] for stars in STARS},
+            )
+            for row in rows
+        ]
+        summaries.delete()
+        EventRatingSummary.objects.bulk_create(rebuilt, batch_size=500)
+    return len(rebuilt)
@@ -0,0 +1,145 @@
+"""
+SQLite FTS5 index over event title, description, venue name and city.
+
+The events_event_fts table is created by migration 0010 on SQLite and kept
+in sync by the signal handlers in events.signals. On other databases, or
+SQLite builds without FTS5, available() is False and EventSearchForm falls
+back to icontains filtering.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'events_event_fts'
+MAX_RESULTS = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+# bm25 column weights: title, description, venue name, city
+WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+_available = None
+
+
+def available():
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def _index_sql(where=''):
+    return (
+        f"INSERT INTO {FTS_TABLE} (rowid, title, description, venue_name, city) "
+        "SELECT e.id, e.title, e.description, v.name, v.city "
+        "FROM events_event e JOIN events_venue v ON v.id = e.venue_id " + where
+    )
+
+
+def index_events(event_ids):
+    """(Re)index the given events in place"""
+    event_ids = [int(event_id) for event_id in event_ids]
+    if not event_ids or not available():
+        return
+    placeholders = ', '.join(['%s'] * len(event_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", event_ids)
+        cursor.execute(_index_sql(f"WHERE e.id IN ({placeholders})"), event_ids)
+
+
+def index_venue(venue_id):
+    """Reindex every event at a venue after its name or city changed"""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM events_event WHERE venue_id = %s)",
+            [venue_id]
+        )
+        cursor.execute(_index_sql("WHERE e.venue_id = %s"), [venue_id])
+
+
+def remove_events(event_ids):
+    event_ids = [int(event_id) for event_id in event_ids]
+    if not event_ids or not available():
+        return
+    placeholders = ', '.join(['%s'] * len(event_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", event_ids)
+
+
+def rebuild():
+    """Rebuild the whole index from the events and venues tables"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_index_sql())
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(text):
+    """Turn user input into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _weights():
+    return ', '.join(str(weight) for weight in WEIGHTS)
+
+
+def search(text, limit=MAX_RESULTS):
+    """Return matching event ids, best BM25 rank first"""
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {_weights()}) LIMIT %s",
+            [expression, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def use_index(backend=None):
+    """True if searches should go through the FTS index.
+
+    backend is 'fts' or 'icontains'; it defaults to the EVENT_SEARCH_BACKEND
+    setting, and 'fts' quietly degrades to 'icontains' when the index does
+    not exist on this database.
+    """
+    backend = backend or getattr(settings, 'EVENT_SEARCH_BACKEND', 'fts')
+    return backend == 'fts' and available()
+
+
+def filter_matching(queryset, text):
+    """Restrict queryset to events matching text, in no particular order.
+
+    The match is a subquery of the same SQL statement, so the other filters
+    on queryset apply to every match rather than to a capped list of ids.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+    )
+
+
+def filter_ranked(queryset, text):
+    """Restrict queryset to events matching text, best match first"""
+    expression = match_expression(text)
+    if expression is None:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    rank = RawSQL(
+        f"SELECT bm25({FTS_TABLE}, {_weights()}) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id",
+        [expression],
+        output_field=FloatField()
+    )
+    return filter_matching(queryset, text).annotate(search_rank=rank).order_by('search_rank', 'pk')
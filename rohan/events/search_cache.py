@@ -0,0 +1,138 @@
+"""
+Per-process LRU cache of event search results.
+
+Entries are keyed on the normalized cleaned_data of an EventSearchForm and
+hold the ordered list of matching event ids plus the facet counts, so a hot
+search costs one dictionary lookup and one query for the page of events.
+
+Every key includes the catalog version, a counter kept in the database
+(an IdSequence row) and bumped whenever an Event, Venue or Category is
+saved or deleted (see events.signals). The Django cache is per process
+unless CACHES says otherwise, so the counter cannot live there: every
+process must see a bump. After a bump no process can hit an older entry;
+those entries simply age out of the LRU. Date filters depend on the clock,
+so entries also expire after SEARCH_CACHE_TIMEOUT seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import search, search_log
+from .models import Event, IdSequence
+
+CACHE_SIZE = getattr(settings, 'SEARCH_CACHE_SIZE', 512)
+CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300)
+VERSION_NAMESPACE = 'catalog_version'
+
+
+def catalog_version():
+    version = (
+        IdSequence.objects.filter(namespace=VERSION_NAMESPACE).values_list('next_value', flat=True).first()
+    )
+    return 0 if version is None else version
+
+
+def bump_catalog_version():
+    if not IdSequence.objects.filter(namespace=VERSION_NAMESPACE).update(next_value=F('next_value') + 1):
+        IdSequence.objects.get_or_create(namespace=VERSION_NAMESPACE)
+        IdSequence.objects.filter(namespace=VERSION_NAMESPACE).update(next_value=F('next_value') + 1)
+
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_results = LRUCache(CACHE_SIZE)
+
+
+def normalize(cleaned_data):
+    """Hashable form of a search: equivalent searches give equal keys"""
+    query = ' '.join((cleaned_data.get('query') or '').lower().split())
+    location = ' '.join((cleaned_data.get('location') or '').lower().split())
+    category = cleaned_data.get('category')
+    return (
+        query,
+        location,
+        category.pk if category else None,
+        cleaned_data.get('price_range') or '',
+        cleaned_data.get('date_range') or '',
+        cleaned_data.get('latitude'),
+        cleaned_data.get('longitude'),
+        cleaned_data.get('radius') or '',
+        cleaned_data.get('sort') or '',
+    )
+
+
+def search_events(form):
+    """Return (event ids, distances or None, facet counts) for a valid EventSearchForm.
+
+    Searches active events in the same order as the search views; distances
+    are listed alongside the ids when the search is by distance.
+    """
+    key = (
+        catalog_version(),
+        timezone.localdate(),
+        search.use_index(),
+        normalize(form.cleaned_data),
+    )
+    result = _results.get(key)
+    if result is None:
+        with search_log.logged(form) as record:
+            result = run_search(form)
+            record.results = len(result[0])
+        _results.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def run_search(form, backend=None):
+    """search_events without the cache, backend as in search.use_index()"""
+    events = Event.objects.filter(is_active=True).order_by('date')
+    facets = form.facet_counts(events, backend)
+    events = form.filter_events(events, backend)
+    if form.uses_distance:
+        rows = list(events.values_list('pk', 'distance'))
+        return [pk for pk, distance in rows], [distance for pk, distance in rows], facets
+    return list(events.values_list('pk', flat=True)), None, facets
+
+
+def load_page(page_obj, distances=None):
+    """Replace the ids on a page of cached results with their events, in order"""
+    ids = list(page_obj.object_list)
+    events = Event.objects.select_related('venue', 'category').in_bulk(ids)
+    page = [events[pk] for pk in ids if pk in events]
+    if distances is not None:
+        offset = page_obj.start_index() - 1
+        by_id = dict(zip(ids, distances[offset:offset + len(ids)]))
+        for event in page:
+            event.distance = by_id[event.pk]
+    page_obj.object_list = page
+    return page_obj
@@ -0,0 +1,118 @@
+"""
+Sampled, append-only log of event searches.
+
+A sampled search appends one JSON line with short keys:
+
+    {"t": 1760781234.5, "s": "search", "p": {"query": "jazz"}, "ms": 4.21, "q": 3, "n": 17}
+
+t is the time, s the caller, p the normalized form parameters, ms the
+latency, q the number of SQL queries and n the number of results. Lines are
+small and written with O_APPEND, so processes can share one file. The
+replay_search_log command runs a captured log again and reports latency
+percentiles per query shape.
+"""
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+LOG_PATH = getattr(settings, 'SEARCH_LOG_PATH', None)
+SAMPLE_RATE = getattr(settings, 'SEARCH_LOG_SAMPLE_RATE', 0.01)
+
+PARAMS = ('query', 'location', 'category', 'price_range', 'date_range', 'latitude', 'longitude', 'radius', 'sort')
+
+_write_lock = threading.Lock()
+
+
+def params(cleaned_data):
+    """Normalized, JSON-friendly search parameters, without empty ones"""
+    values = {}
+    for name in PARAMS:
+        value = cleaned_data.get(name)
+        if isinstance(value, str):
+            value = ' '.join(value.lower().split())
+        elif hasattr(value, 'pk'):
+            value = value.pk
+        if value not in (None, ''):
+            values[name] = value
+    return values
+
+
+def shape(search_params, scope='search'):
+    """What kind of search this was, ignoring the actual values"""
+    names = []
+    for name in PARAMS:
+        if name not in search_params:
+            continue
+        if name == 'query':
+            words = len(str(search_params['query']).split())
+            names.append(f'query{min(words, 3)}{"+" if words > 3 else ""}')
+        elif name not in ('latitude', 'longitude'):
+            names.append(name)
+    return f"{scope}:{'+'.join(names) or 'all'}"
+
+
+class Record:
+    def __init__(self):
+        self.results = None
+
+
+def write(entry):
+    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+    line = json.dumps(entry, separators=(',', ':'), default=str) + '\n'
+    with _write_lock:
+        with open(LOG_PATH, 'a', encoding='utf-8') as log_file:
+            log_file.write(line)
+
+
+@contextmanager
+def logged(form, scope='search'):
+    """Time the searching done in the block and log it, for a sample of searches.
+
+    Set record.results to the number of results inside the block.
+    """
+    record = Record()
+    if not LOG_PATH or random.random() >= SAMPLE_RATE:
+        yield record
+        return
+
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        yield record
+    elapsed = (time.perf_counter() - started) * 1000
+    try:
+        write({
+            't': round(time.time(), 3),
+            's': scope,
+            'p': params(form.cleaned_data),
+            'ms': round(elapsed, 3),
+            'q': queries,
+            'n': record.results,
+        })
+    except OSError:
+        # Losing a sample must never break a search
+        pass
+
+
+def read(path):
+    """Yield the entries of a log file, skipping damaged lines"""
+    with open(path, encoding='utf-8') as log_file:
+        for line in log_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get('p'), dict):
+                yield entry
@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import SeatInventory, Section
+
+# Optimistic concurrency retries before giving up on a busy section
+MAX_RETRIES = 10
+
+
+class SectionBusy(Exception):
+    """Seats could not be released because the section kept changing.
+
+    The caller must roll back whatever made the seats free (a cancelled or
+    expired booking), or they would stay taken in the bitmap for good.
+    """
+
+
+class SeatMap:
+    """In-memory bitmap of a section's seats, one bit per seat, row-major.
+
+    The whole map is held as a single Python int, so checking a row for a run
+    of free seats is a handful of shifts and ANDs instead of a loop over seats.
+    Rows and seats are numbered from 0 internally.
+    """
+
+    def __init__(self, rows, seats_per_row, data=b''):
+        self.rows = rows
+        self.seats_per_row = seats_per_row
+        self.taken = int.from_bytes(bytes(data), 'little')
+        self.row_mask = (1 << seats_per_row) - 1
+
+    @property
+    def capacity(self):
+        return self.rows * self.seats_per_row
+
+    def to_bytes(self):
+        return self.taken.to_bytes((self.capacity + 7) // 8, 'little')
+
+    def remaining(self):
+        return self.capacity - self.taken.bit_count()
+
+    def _bit(self, row, seat):
+        return 1 << (row * self.seats_per_row + seat)
+
+    def is_free(self, row, seat):
+        return not self.taken & self._bit(row, seat)
+
+    def take(self, seats):
+        for row, seat in seats:
+            self.taken |= self._bit(row, seat)
+
+    def release(self, seats):
+        for row, seat in seats:
+            self.taken &= ~self._bit(row, seat)
+
+    def free_in_row(self, row):
+        return ~(self.taken >> (row * self.seats_per_row)) & self.row_mask
+
+    def best_adjacent(self, count):
+        """Return count adjacent free seats, front rows first and then closest
+        to the middle of the row, or None if no row has such a gap"""
+        if count < 1 or count > self.seats_per_row:
+            return None
+
+        middle = (self.seats_per_row - count) / 2
+        for row in range(self.rows):
+            free = self.free_in_row(row)
+            # Bit i of starts is set when seats i .. i+count-1 are all free
+            starts = free
+            for offset in range(1, count):
+                starts &= free >> offset
+            if not starts:
+                continue
+
+            best = None
+            while starts:
+                low = starts & -starts
+                start = low.bit_length() - 1
+                if best is None or abs(start - middle) < abs(best - middle):
+                    best = start
+                starts ^= low
+            return [(row, seat) for seat in range(best, best + count)]
+        return None
+
+    def best_available(self, count):
+        """Adjacent seats when possible, otherwise the frontmost free seats"""
+        seats = self.best_adjacent(count)
+        if seats is not None:
+            return seats
+
+        seats = []
+        for row in range(self.rows):
+            free = self.free_in_row(row)
+            while free and len(seats) < count:
+                low = free & -free
+                seats.append((row, low.bit_length() - 1))
+                free ^= low
+            if len(seats) == count:
+                return seats
+        return None
+
+
+def seat_label(section, row, seat):
+    return f"{section.name}, Row {row + 1}, Seat {seat + 1}"
+
+
+def get_inventories(event):
+    """Return {section_id: SeatInventory} for the event, creating missing rows in bulk"""
+    sections = list(Section.objects.filter(venue_id=event.venue_id))
+    if not sections:
+        return {}
+
+    inventories = {inv.section_id: inv for inv in SeatInventory.objects.filter(event=event)}
+    missing = [section for section in sections if section.pk not in inventories]
+    if missing:
+        SeatInventory.objects.bulk_create(
+            [SeatInventory(event=event, section=section,
+                           taken=SeatMap(section.rows, section.seats_per_row).to_bytes(),
+                           remaining=section.capacity)
+             for section in missing],
+            ignore_conflicts=True
+        )
+        inventories = {inv.section_id: inv for inv in SeatInventory.objects.filter(event=event)}
+    return inventories
+
+
+def remaining_by_section(event):
+    """Return [(section, remaining seats)] in section order"""
+    inventories = get_inventories(event)
+    sections = Section.objects.filter(venue_id=event.venue_id)
+    return [(section, inventories[section.pk].remaining) for section in sections if section.pk in inventories]
+
+
+def _save_map(inventory, seat_map, remaining_change):
+    """Write a changed bitmap if nobody else changed it since it was read"""
+    return SeatInventory.objects.filter(pk=inventory.pk, version=inventory.version).update(
+        taken=seat_map.to_bytes(),
+        remaining=F('remaining') + remaining_change,
+        version=F('version') + 1
+    ) == 1
+
+
+def assign_seats(event, section, count):
+    """Pick and take the best count seats in a section, returns [[row, seat], ...] or None"""
+    for _ in range(MAX_RETRIES):
+        inventory = SeatInventory.objects.filter(event=event, section=section).first()
+        if inventory is None:
+            inventory = get_inventories(event).get(section.pk)
+            if inventory is None:
+                return None
+        if inventory.remaining < count:
+            return None
+
+        seat_map = SeatMap(section.rows, section.seats_per_row, inventory.taken)
+        seats = seat_map.best_available(count)
+        if seats is None:
+            return None
+        seat_map.take(seats)
+        if _save_map(inventory, seat_map, -count):
+            return [list(seat) for seat in seats]
+    return None
+
+
+def release_assigned_seats(holds):
+    """Give seats back for many bookings at once.
+
+    holds is an iterable of (event_id, section_id, seats); every affected
+    section bitmap is read and written once. Raises SectionBusy if a bitmap
+    is still changing after MAX_RETRIES attempts.
+    """
+    grouped = defaultdict(list)
+    for event_id, section_id, seats in holds:
+        if section_id and seats:
+            grouped[(event_id, section_id)].extend(tuple(seat) for seat in seats)
+
+    for (event_id, section_id), seats in grouped.items():
+        for _ in range(MAX_RETRIES):
+            inventory = SeatInventory.objects.select_related('section').filter(
+                event_id=event_id, section_id=section_id
+            ).first()
+            if inventory is None:
+                break
+            seat_map = SeatMap(inventory.section.rows, inventory.section.seats_per_row, inventory.taken)
+            freed = [seat for seat in set(seats) if not seat_map.is_free(*seat)]
+            seat_map.release(freed)
+            if _save_map(inventory, seat_map, len(freed)):
+                break
+        else:
+            raise SectionBusy(f'Section {section_id} of event {event_id} kept changing')
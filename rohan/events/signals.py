@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import autocomplete, ratings, search, search_cache
+from .models import Category, Event, Review, Venue
+
+# Sent with sender=Booking, booking_id, user_id, total_amount, from_status and
+# to_status by events.inventory, whose status changes are UPDATEs that send no
+# post_save. Receivers run inside the transaction making the change.
+booking_status_changed = Signal()
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_events([instance.pk])
+        autocomplete.event_saved(instance)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, **kwargs):
+    search.remove_events([instance.pk])
+    autocomplete.event_deleted(instance.pk)
+
+
+@receiver(post_delete, sender=Venue)
+def unindex_venue(sender, instance, **kwargs):
+    autocomplete.venue_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Venue)
+def index_venue_events(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        search.index_venue(instance.pk)
+    autocomplete.venue_saved(instance)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    search_cache.bump_catalog_version()
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_save, sender=Category)
+def touch_events(sender, instance, created, raw=False, **kwargs):
+    """Event cards show venue and category names, so their cached cards must go"""
+    if raw or created:
+        return
+    field = 'venue' if sender is Venue else 'category'
+    Event.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def touch_reviewed_event(sender, instance, raw=False, **kwargs):
+    """The event page shows its reviews, so its ETag must change with them"""
+    if not raw:
+        Event.objects.filter(pk=instance.event_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Review)
+def unrate_event(sender, instance, **kwargs):
+    ratings.review_removed(instance.event_id, instance.rating)
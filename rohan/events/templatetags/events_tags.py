@@ -0,0 +1,91 @@
+import uuid
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'events/_event_card.html'
+CARD_NOTE_MARKER = '<!-- card-note -->'
+CARD_CACHE_TIMEOUT = getattr(settings, 'EVENT_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+@register.simple_tag
+def idempotency_key_field():
+    """Hidden input with a fresh idempotency key, so resubmitting the form is harmless"""
+    return format_html('<input type="hidden" name="idempotency_key" value="{}">', uuid.uuid4().hex)
+
+
+@register.simple_tag(takes_context=True)
+def facet_query(context, facet, value=None):
+    """Query string for the current search with one facet set to value, or cleared when value is None.
+
+    Quick search's q parameter is carried over as the advanced search query.
+    """
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    if 'q' in params:
+        params['query'] = params.pop('q')[-1]
+    if value is None:
+        params.pop(facet, None)
+    else:
+        params[facet] = str(value)
+    return '?' + params.urlencode()
+
+
+def _card_key(event, badge):
+    # updated_at changes on every save of the event, and venue or category
+    # changes touch it too (see events.signals), so old cards are never hit
+    return f'event_card:{int(bool(badge))}:{event.pk}:{event.updated_at.timestamp()}'
+
+
+def _render_cards(events, badge):
+    """Render and cache cards, loading venues, categories and ratings for all of them at once"""
+    prefetch_related_objects(events, 'venue', 'category', 'rating_summary')
+    cards = {
+        _card_key(event, badge): render_to_string(CARD_TEMPLATE, {'event': event, 'badge': badge})
+        for event in events
+    }
+    cache.set_many(cards, CARD_CACHE_TIMEOUT)
+    return cards
+
+
+def _loaded_cards(context):
+    cards = context.render_context.get('event_cards')
+    if cards is None:
+        cards = context.render_context['event_cards'] = {}
+    return cards
+
+
+@register.simple_tag(takes_context=True)
+def load_event_cards(context, events, badge=False):
+    """Fetch the cards for a whole page of events with one cache round trip.
+
+    Cards that are not cached yet are rendered here in one batch; the
+    event_card tags that follow then only read them.
+    """
+    events = list(events)
+    keys = {_card_key(event, badge): event for event in events}
+    cards = cache.get_many(list(keys))
+    missing = [event for key, event in keys.items() if key not in cards]
+    if missing:
+        cards.update(_render_cards(missing, badge))
+    _loaded_cards(context).update(cards)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def event_card(context, event, badge=False, note=''):
+    """Cached card for an event; note is a per-user line added below the details"""
+    key = _card_key(event, badge)
+    html = _loaded_cards(context).get(key) or cache.get(key)
+    if html is None:
+        html = _render_cards([event], badge)[key]
+    if note:
+        html = html.replace(CARD_NOTE_MARKER, format_html('<p class="text-muted small mt-2">{}</p>', note))
+    return mark_safe(html)
@@ -1,3 +1,136 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.contrib.messages import get_messages
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import checkin, idempotency
+from .inventory import hold_seats
+from .models import Booking, Category, Event, IdempotencyKey, Ticket, Venue
+
+
+class ConcurrentCheckinTests(TransactionTestCase):
+    """Gates scanning the same tickets at the same time"""
+
+    GATES = 4
+    TICKETS = 50
+
+    def setUp(self):
+        user = User.objects.create_user('gate', password='x')
+        category = Category.objects.create(name='Concert', slug='concert')
+        venue = Venue.objects.create(name='Arena', address='1 Main St', city='Springfield',
+                                     state='IL', zip_code='62701', capacity=1000)
+        self.event = Event.objects.create(title='Show', description='Show', category=category, venue=venue,
+                                          date=timezone.now() + timedelta(days=1), price=10)
+        booking = Booking.objects.create(user=user, event=self.event, quantity=self.TICKETS,
+                                         total_amount=10 * self.TICKETS, status='confirmed')
+        Ticket.objects.bulk_create(
+            [Ticket(booking=booking, ticket_number=f'TKT-{n:04d}') for n in range(self.TICKETS)]
+        )
+        self.numbers = [f'TKT-{n:04d}' for n in range(self.TICKETS)]
+        checkin._indexes.clear()
+
+    def tearDown(self):
+        checkin._indexes.clear()
+
+    def scan_from_gates(self, scans_for_gate):
+        # Every gate loads its own index first, like gates served by different
+        # processes, so they all start out believing every ticket is unused
+        indexes = [checkin.TicketIndex(self.event.pk) for gate in range(self.GATES)]
+        barrier = threading.Barrier(self.GATES)
+        results = [None] * self.GATES
+        errors = []
+
+        def gate(number):
+            try:
+                barrier.wait()
+                checkin._indexes[self.event.pk] = indexes[number]
+                results[number] = checkin.process_scans(self.event, scans_for_gate(number))[0]
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=gate, args=(number,)) for number in range(self.GATES)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_each_ticket_is_admitted_by_one_gate(self):
+        results = self.scan_from_gates(lambda gate: [{'ticket_number': number} for number in self.numbers])
+
+        admitted = [result['ticket_number'] for gate_results in results for result in gate_results
+                    if result['status'] == 'admitted']
+        self.assertCountEqual(admitted, self.numbers)
+        for gate_results in results:
+            self.assertTrue(all(result['status'] in ('admitted', 'already_used') for result in gate_results))
+        self.assertEqual(Ticket.objects.filter(is_used=True).count(), self.TICKETS)
+
+    def test_unknown_numbers_are_looked_up_once(self):
+        index = checkin.TicketIndex(self.event.pk)
+        forged = [f'FAKE-{n}' for n in range(200)]
+        with self.assertNumQueries(1):
+            self.assertEqual(index.get_many(forged), {})
+        with self.assertNumQueries(0):
+            self.assertIsNone(index.get(forged[0]))
+
+
+class SeatCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('fan', password='x')
+        category = Category.objects.create(name='Concert', slug='concert')
+        venue = Venue.objects.create(name='Club', address='1 Main St', city='Springfield',
+                                     state='IL', zip_code='62701', capacity=10)
+        self.event = Event.objects.create(title='Show', description='Show', category=category, venue=venue,
+                                          date=timezone.now() + timedelta(days=1), price=10)
+
+    def test_saving_a_stale_event_keeps_the_counter(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        hold_seats(self.user, self.event, 8)
+        stale.description = 'Edited'
+        stale.save()
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(event.description, 'Edited')
+        self.assertEqual(event.seats_remaining, 2)
+
+
+class IdempotentFormTests(TestCase):
+    """A browser submitting the same form twice"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('fan', password='x')
+        category = Category.objects.create(name='Concert', slug='concert')
+        venue = Venue.objects.create(name='Club', address='1 Main St', city='Springfield',
+                                     state='IL', zip_code='62701', capacity=10)
+        event = Event.objects.create(title='Show', description='Show', category=category, venue=venue,
+                                     date=timezone.now() + timedelta(days=1), price=10)
+        booking = Booking.objects.create(user=self.user, event=event, quantity=1, status='confirmed')
+        self.url = reverse('events:cancel_booking', args=[booking.pk])
+        self.client.force_login(self.user)
+
+    def test_duplicate_replays_the_first_redirect(self):
+        self.client.post(self.url, {'idempotency_key': 'k1'})
+        response = self.client.post(self.url, {'idempotency_key': 'k1'})
+        self.assertRedirects(response, reverse('events:my_bookings'), fetch_redirect_response=False)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_duplicate_of_a_running_request_is_redirected(self):
+        self.client.post(self.url, {'idempotency_key': 'k1'})
+        IdempotencyKey.objects.update(response_status=None, response_location='')
+        with mock.patch.object(idempotency, 'REPLAY_WAIT', 0.2):
+            response = self.client.post(self.url, {'idempotency_key': 'k1'})
+        self.assertRedirects(response, reverse('events:my_bookings'), fetch_redirect_response=False)
+        self.assertIn('still being processed', [str(m) for m in get_messages(response.wsgi_request)][-1])
+
+    def test_resubmitting_changed_data_is_redirected(self):
+        self.client.post(self.url, {'idempotency_key': 'k1'})
+        response = self.client.post(self.url, {'idempotency_key': 'k1', 'reason': 'changed'})
+        self.assertRedirects(response, reverse('events:my_bookings'), fetch_redirect_response=False)
@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.db import IntegrityError
+from .models import Ticket
+from .seatmap import seat_label
+
+# Rounds of top-up inserts before giving up on ticket number collisions
+MAX_ISSUE_ROUNDS = 5
+
+
+def _new_ticket_numbers(count):
+    numbers = set()
+    while len(numbers) < count:
+        numbers.add(Ticket.generate_ticket_number())
+    return numbers
+
+
+def issue_tickets(booking, quantity):
+    """Create all tickets for a booking with one batch INSERT.
+
+    Ticket numbers are generated up front. Rows whose number collides with an
+    existing ticket are skipped by the database instead of failing the batch,
+    and only the missing tickets are generated again and inserted. Bookings
+    with reserved seating get one ticket per assigned seat.
+    Must be called inside the booking transaction.
+    """
+    if booking.seats:
+        wanted = Counter(seat_label(booking.section, row, seat) for row, seat in booking.seats)
+    else:
+        wanted = Counter({'': quantity})
+
+    missing = wanted
+    for _ in range(MAX_ISSUE_ROUNDS):
+        labels = list(missing.elements())
+        Ticket.objects.bulk_create(
+            [Ticket(booking=booking, ticket_number=number, seat_label=label)
+             for number, label in zip(_new_ticket_numbers(len(labels)), labels)],
+            ignore_conflicts=True
+        )
+        issued = Counter(Ticket.objects.filter(booking=booking).values_list('seat_label', flat=True))
+        missing = wanted - issued
+        if not missing:
+            return sum(issued.values())
+
+    raise IntegrityError(
+        f'Could not issue {quantity} unique tickets for booking {booking.booking_reference}'
+    )
@@ -6,15 +6,27 @@ app_name = 'events'
 urlpatterns = [
     path('', views.event_list, name='event_list'),
     path('<int:pk>/', views.event_detail, name='event_detail'),
+    path('<int:pk>/reviews/', views.event_reviews, name='event_reviews'),
     path('category/<slug:slug>/', views.events_by_category, name='events_by_category'),
     path('search/', views.search_events, name='search_events'),
     path('advanced-search/', views.advanced_search, name='advanced_search'),
+    path('autocomplete/', views.autocomplete_events, name='autocomplete'),
     path('favorite/<int:event_id>/', views.toggle_favorite, name='toggle_favorite'),
     path('review/<int:event_id>/', views.add_review, name='add_review'),
     path('book/<int:event_id>/', views.book_event, name='book_event'),
+    path('book/<int:event_id>/waiting-room/', views.waiting_room_view, name='waiting_room'),
+    path('book/<int:event_id>/waiting-room/status/', views.waiting_room_status, name='waiting_room_status'),
+    path('booking/checkout/<int:booking_id>/', views.checkout, name='checkout'),
     path('booking/confirmation/<int:booking_id>/', views.booking_confirmation, name='booking_confirmation'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
+    path('feeds/bookings/<str:token>.ics', views.bookings_feed, name='bookings_feed'),
+    path('feeds/favorites/<str:token>.ics', views.favorites_feed, name='favorites_feed'),
+    path('feeds/category/<slug:slug>.ics', views.category_feed, name='category_feed'),
+    path('feeds/reset/', views.reset_feed_token, name='reset_feed_token'),
     path('cancel-booking/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('<int:event_id>/checkin/manifest/', views.checkin_manifest, name='checkin_manifest'),
+    path('<int:event_id>/checkin/scans/', views.checkin_scans, name='checkin_scans'),
+    path('<int:event_id>/checkin/sync/', views.checkin_sync, name='checkin_sync'),
     path('create/', views.create_event, name='create_event'),
     path('my-events/', views.my_events, name='my_events'),
     path('edit/<int:event_id>/', views.edit_event, name='edit_event'),
@@ -1,40 +1,57 @@
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.db.models import Q, Avg
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Count, Exists, Max, OuterRef, Value
 from django.contrib import messages
-from .models import Event, Category, UserFavorite, Review, Booking, Ticket
+from django.utils import timezone
+from django.utils.formats import date_format
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import Event, Category, Section, UserFavorite, Review, Booking
 from .forms import EventSearchForm, EventForm, VenueForm
+from .inventory import hold_seats, confirm_hold, release_booking
+from .tickets import issue_tickets
+from . import autocomplete, checkin, homepage, ical, ratings, search_cache, seatmap, waiting_room
+from .idempotency import idempotent
+from .pagination import InvalidCursor, KeysetPaginator, paginate
+from .conditional import conditional_page
+from notifications.outbox import enqueue, enqueue_notification
 from django.core.paginator import Paginator
 
+CHECKIN_MAX_BATCH = getattr(settings, 'CHECKIN_MAX_BATCH', 5000)
+REVIEWS_PAGE_SIZE = getattr(settings, 'REVIEWS_PAGE_SIZE', 5)
 
-def home(request):
-    categories = Category.objects.all()[:3]  # Get first 3 categories for display
-    featured_events = Event.objects.filter(is_active=True)[:6]
 
-    # Get events by category for the home page
-    concerts = Event.objects.filter(category__slug='concert', is_active=True)[:3]
-    festivals = Event.objects.filter(category__slug='festival', is_active=True)[:3]
-    sports = Event.objects.filter(category__slug='sports', is_active=True)[:3]
+def home(request):
+    # Served from a precomputed snapshot, see events/homepage.py
+    snapshot = homepage.get_snapshot()
 
     context = {
-        'categories': categories,
-        'featured_events': featured_events,
-        'concerts': concerts,
-        'festivals': festivals,
-        'sports': sports,
+        'categories': snapshot['categories'],
+        'featured_events': snapshot['featured_events'],
+        'rails': snapshot['rails'],
     }
     return render(request, 'events/home.html', context)
 
 
+def _event_list_state(request):
+    state = Event.objects.filter(is_active=True).aggregate(updated_at=Max('updated_at'), count=Count('id'))
+    # The catalog version also covers the category links
+    return state['updated_at'], (state['count'], search_cache.catalog_version())
+
+
+@conditional_page(_event_list_state)
 def event_list(request):
-    events = Event.objects.filter(is_active=True).order_by('date')
+    events = Event.objects.filter(is_active=True)
     categories = Category.objects.all()
 
     # Pagination
-    paginator = Paginator(events, 12)  # Show 12 events per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, events, 12, ('date', 'id'))  # Show 12 events per page
 
     context = {
         'page_obj': page_obj,
@@ -43,10 +60,28 @@ def event_list(request):
     return render(request, 'events/event_list.html', context)
 
 
+def _event_detail_state(request, pk):
+    if request.user.is_authenticated:
+        is_favorite = Exists(UserFavorite.objects.filter(user=request.user, event=OuterRef('pk')))
+    else:
+        is_favorite = Value(False)
+    # Saving a review, venue or category touches updated_at, see events.signals
+    row = (
+        Event.objects.filter(pk=pk, is_active=True)
+        .annotate(is_favorite=is_favorite)
+        .values_list('updated_at', 'is_favorite')
+        .first()
+    )
+    return row and (row[0], row[1])
+
+
+@conditional_page(_event_detail_state)
 def event_detail(request, pk):
-    event = get_object_or_404(Event, pk=pk, is_active=True)
-    reviews = event.reviews.all().order_by('-created_at')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+    event = get_object_or_404(Event.objects.select_related('venue', 'rating_summary'), pk=pk, is_active=True)
+    # Only the newest page of reviews; the rest load from event_reviews
+    reviews = _review_paginator(event).page()
+    # Events nobody has reviewed yet have no summary row
+    rating_summary = getattr(event, 'rating_summary', None)
 
     is_favorite = False
     if request.user.is_authenticated:
@@ -55,20 +90,53 @@ def event_detail(request, pk):
     context = {
         'event': event,
         'reviews': reviews,
-        'avg_rating': avg_rating,
+        'avg_rating': rating_summary.average if rating_summary else None,
+        'rating_summary': rating_summary,
         'is_favorite': is_favorite,
     }
     return render(request, 'events/event_detail.html', context)
 
 
+def _review_paginator(event):
+    return KeysetPaginator(event.reviews.select_related('user'), REVIEWS_PAGE_SIZE, ('-created_at', '-id'))
+
+
+def event_reviews(request, pk):
+    event = get_object_or_404(Event, pk=pk, is_active=True)
+    try:
+        page = _review_paginator(event).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+
+    return JsonResponse({
+        'reviews': [
+            {
+                'user': review.user.username,
+                'rating': review.rating,
+                'comment': review.comment,
+                'created_at': review.created_at.isoformat(),
+                'created_on': date_format(timezone.localtime(review.created_at), 'M d, Y'),
+            }
+            for review in page
+        ],
+        'next': page.next_page_number() if page.has_next() else None,
+    })
+
+
+def _events_by_category_state(request, slug):
+    state = Event.objects.filter(category__slug=slug, is_active=True).aggregate(
+        updated_at=Max('updated_at'), count=Count('id'),
+    )
+    return state['updated_at'], (state['count'], search_cache.catalog_version())
+
+
+@conditional_page(_events_by_category_state)
 def events_by_category(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    events = Event.objects.filter(category=category, is_active=True).order_by('date')
+    events = Event.objects.filter(category=category, is_active=True)
 
     # Pagination
-    paginator = Paginator(events, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, events, 12, ('date', 'id'))
 
     context = {
         'category': category,
@@ -78,40 +146,47 @@ def events_by_category(request, slug):
 
 
 def search_events(request):
-    form = EventSearchForm(request.GET or None)
-    events = Event.objects.filter(is_active=True).order_by('date')
+    # The quick search boxes submit the text as q
+    query = request.GET.get('q') or request.GET.get('query', '')
+    form = EventSearchForm({'query': query} if query else None)
+    facets = None
 
     if form.is_valid():
-        events = form.filter_events(events)
-
-    # Pagination
-    paginator = Paginator(events, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        event_ids, distances, facets = search_cache.search_events(form)
+        paginator = Paginator(event_ids, 12)
+        page_obj = search_cache.load_page(paginator.get_page(request.GET.get('page')))
+    else:
+        page_obj = paginate(request, Event.objects.filter(is_active=True), 12, ('date', 'id'))
 
     context = {
         'page_obj': page_obj,
         'form': form,
-        'query': request.GET.get('q', ''),
+        'query': query,
+        'facets': facets,
     }
     return render(request, 'events/search_results.html', context)
 
 
+def autocomplete_events(request):
+    query = request.GET.get('q', '').strip()[:100]
+    return JsonResponse({'query': query, 'results': autocomplete.suggest(query)})
+
+
 def advanced_search(request):
     form = EventSearchForm(request.GET or None)
-    events = Event.objects.filter(is_active=True).order_by('date')
+    facets = None
 
     if form.is_valid():
-        events = form.filter_events(events)
-
-    # Pagination
-    paginator = Paginator(events, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        event_ids, distances, facets = search_cache.search_events(form)
+        paginator = Paginator(event_ids, 12)
+        page_obj = search_cache.load_page(paginator.get_page(request.GET.get('page')), distances)
+    else:
+        page_obj = paginate(request, Event.objects.filter(is_active=True), 12, ('date', 'id'))
 
     context = {
         'page_obj': page_obj,
         'form': form,
+        'facets': facets,
     }
     return render(request, 'events/advanced_search.html', context)
 
@@ -147,20 +222,29 @@ def add_review(request, event_id):
         rating = request.POST.get('rating')
         comment = request.POST.get('comment')
 
-        if rating and comment:
-            review, created = Review.objects.get_or_create(
-                event=event,
-                user=request.user,
-                defaults={'rating': rating, 'comment': comment}
-            )
-
-            if not created:
-                review.rating = rating
-                review.comment = comment
-                review.save()
-                messages.success(request, 'Your review has been updated!')
-            else:
+        if rating and comment and not (rating.isdigit() and int(rating) in ratings.STARS):
+            messages.error(request, 'Please choose a rating from 1 to 5 stars.')
+        elif rating and comment:
+            rating = int(rating)
+            with transaction.atomic():
+                # The lock keeps the old rating valid until the summary is updated
+                review, created = Review.objects.select_for_update().get_or_create(
+                    event=event,
+                    user=request.user,
+                    defaults={'rating': rating, 'comment': comment}
+                )
+
+                if not created:
+                    ratings.review_changed(event.pk, review.rating, rating)
+                    review.rating = rating
+                    review.comment = comment
+                    review.save()
+                else:
+                    ratings.review_added(event.pk, rating)
+            if created:
                 messages.success(request, 'Your review has been added!')
+            else:
+                messages.success(request, 'Your review has been updated!')
         else:
             messages.error(request, 'Please provide both rating and comment.')
 
@@ -168,46 +252,122 @@ def add_review(request, event_id):
 
 
 @login_required
+@idempotent('book_event')
 def book_event(request, event_id):
     event = get_object_or_404(Event, id=event_id, is_active=True)
 
+    # Events with a waiting room only let admitted users through
+    if waiting_room.get_admission_rate(event.id):
+        if not waiting_room.is_admitted(waiting_room.get_ticket(request, event.id)):
+            return redirect('events:waiting_room', event_id=event.id)
+
     if request.method == 'POST':
-        quantity = int(request.POST.get('quantity', 1))
-
-        # Create booking
-        booking = Booking.objects.create(
-            user=request.user,
-            event=event,
-            quantity=quantity,
-            total_amount=event.price * quantity
-        )
+        try:
+            quantity = int(request.POST.get('quantity', 1))
+        except ValueError:
+            quantity = 0
+
+        if quantity < 1:
+            messages.error(request, 'Please select a valid number of tickets.')
+            return redirect('events:book_event', event_id=event.id)
+
+        # Venues with reserved seating need a section to pick seats from
+        section = None
+        if Section.objects.filter(venue_id=event.venue_id).exists():
+            section = Section.objects.filter(
+                venue_id=event.venue_id,
+                id=request.POST.get('section') or 0
+            ).first()
+            if section is None:
+                messages.error(request, 'Please choose a section.')
+                return redirect('events:book_event', event_id=event.id)
+
+        # Hold the seats while the user completes checkout
+        booking = hold_seats(request.user, event, quantity, section=section)
+        if booking is None:
+            messages.error(request, f'Sorry, there are not enough seats left for {event.title}.')
+            return redirect('events:book_event', event_id=event.id)
+
+        return redirect('events:checkout', booking_id=booking.id)
+
+    context = {
+        'event': event,
+        'sections': seatmap.remaining_by_section(event),
+    }
+    return render(request, 'events/book_event.html', context)
+
+
+@login_required
+def waiting_room_view(request, event_id):
+    event = get_object_or_404(Event, id=event_id, is_active=True)
+    admission_rate = waiting_room.get_admission_rate(event.id)
+    if not admission_rate:
+        return redirect('events:book_event', event_id=event.id)
+
+    ticket = waiting_room.get_ticket(request, event.id, join_queue=True)
+    if waiting_room.is_admitted(ticket):
+        return redirect('events:book_event', event_id=event.id)
+
+    context = {
+        'event': event,
+        'status': waiting_room.queue_status(ticket, admission_rate),
+    }
+    return render(request, 'events/waiting_room.html', context)
+
+
+@login_required
+def waiting_room_status(request, event_id):
+    # Answered from the signed session token and the cached admission rate
+    admission_rate = waiting_room.get_admission_rate(event_id)
+    ticket = waiting_room.get_ticket(request, event_id)
+    if not admission_rate or ticket is None:
+        return JsonResponse({'admitted': admission_rate is None, 'position': None})
+
+    return JsonResponse(waiting_room.queue_status(ticket, admission_rate))
 
-        # Create tickets
-        for i in range(quantity):
-            Ticket.objects.create(booking=booking)
-
-        # Create notification
-        from notifications.views import create_notification
-        create_notification(
-            user=request.user,
-            title='Booking Confirmed',
-            message=f'Your booking for {event.title} has been confirmed. Booking reference: {booking.booking_reference}',
-            notification_type='booking_confirmed',
-            event=event,
-            booking=booking
-        )
 
-        # Send confirmation email
-        from .email_utils import send_booking_confirmation_email
-        send_booking_confirmation_email(booking)
+@login_required
+@idempotent('checkout')
+def checkout(request, booking_id):
+    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+    event = booking.event
 
-        messages.success(request, f'Successfully booked {quantity} ticket(s) for {event.title}!')
+    if booking.status == 'confirmed':
+        return redirect('events:booking_confirmation', booking_id=booking.id)
+
+    if not booking.is_hold_active:
+        messages.error(request, 'Your seat hold has expired. Please book again.')
+        return redirect('events:book_event', event_id=event.id)
+
+    if request.method == 'POST':
+        with transaction.atomic():
+            if not confirm_hold(booking):
+                messages.error(request, 'Your seat hold has expired. Please book again.')
+                return redirect('events:book_event', event_id=event.id)
+
+            issue_tickets(booking, booking.quantity)
+
+            # Notification and confirmation email are delivered by the
+            # process_outbox worker once this transaction commits
+            enqueue_notification(
+                user=request.user,
+                title='Booking Confirmed',
+                message=f'Your booking for {event.title} has been confirmed. Booking reference: {booking.booking_reference}',
+                notification_type='booking_confirmed',
+                event=event,
+                booking=booking
+            )
+            enqueue('email.booking_confirmation', booking_id=booking.id)
+
+        messages.success(request, f'Successfully booked {booking.quantity} ticket(s) for {event.title}!')
         return redirect('events:booking_confirmation', booking_id=booking.id)
 
     context = {
+        'booking': booking,
         'event': event,
+        'seat_labels': [f'Row {row + 1} Seat {seat + 1}' for row, seat in booking.seats],
     }
-    return render(request, 'events/book_event.html', context)
+    return render(request, 'events/checkout.html', context)
 
 
 @login_required
@@ -224,32 +384,146 @@ def my_bookings(request):
     bookings = Booking.objects.filter(user=request.user)
     context = {
         'bookings': bookings,
+        'now': timezone.now(),
+        'feed_url': request.build_absolute_uri(
+            reverse('events:bookings_feed', args=[ical.user_token(request.user)])
+        ),
     }
     return render(request, 'events/my_bookings.html', context)
 
 
 @login_required
+@require_POST
+def reset_feed_token(request):
+    """Replace the user's feed secret, revoking every personal feed URL"""
+    ical.reset_user_token(request.user)
+    messages.success(request, 'Your calendar feed links were reset. Subscribe again with the new link.')
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('events:my_bookings')
+
+
+def _feed_response(request, name, items, component):
+    response = StreamingHttpResponse(ical.feed(request, name, items, component),
+                                     content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="events.ics"'
+    return response
+
+
+def _feed_user_id(token):
+    user_id = ical.user_id_for_token(token)
+    if user_id is None:
+        raise Http404('Unknown calendar feed')
+    return user_id
+
+
+def _latest(*values):
+    return max((value for value in values if value is not None), default=None)
+
+
+def _bookings_feed_state(request, token):
+    user_id = ical.user_id_for_token(token)
+    if user_id is None:
+        return None
+    state = Booking.objects.filter(user_id=user_id, status='confirmed').aggregate(
+        updated_at=Max('updated_at'), event_updated_at=Max('event__updated_at'), count=Count('id'),
+    )
+    return _latest(state['updated_at'], state['event_updated_at']), state['count']
+
+
+@conditional_page(_bookings_feed_state)
+def bookings_feed(request, token):
+    bookings = (
+        Booking.objects.filter(user_id=_feed_user_id(token), status='confirmed')
+        .select_related('event__venue')
+        .order_by('event__date', 'id')
+    )
+
+    def component(booking):
+        tickets = f"{booking.quantity} ticket{'s' if booking.quantity != 1 else ''}"
+        return ical.event_component(
+            booking.event, request, uid=f'booking-{booking.pk}@eventsphere',
+            note=f'Booking {booking.booking_reference}, {tickets}',
+        )
+
+    return _feed_response(request, 'My EventSphere bookings', bookings, component)
+
+
+def _favorites_feed_state(request, token):
+    user_id = ical.user_id_for_token(token)
+    if user_id is None:
+        return None
+    state = UserFavorite.objects.filter(user_id=user_id, event__is_active=True).aggregate(
+        created_at=Max('created_at'), event_updated_at=Max('event__updated_at'), count=Count('id'),
+    )
+    return _latest(state['created_at'], state['event_updated_at']), state['count']
+
+
+@conditional_page(_favorites_feed_state)
+def favorites_feed(request, token):
+    favorites = (
+        UserFavorite.objects.filter(user_id=_feed_user_id(token), event__is_active=True)
+        .select_related('event__venue')
+        .order_by('event__date', 'id')
+    )
+
+    def component(favorite):
+        return ical.event_component(favorite.event, request, uid=f'favorite-{favorite.pk}@eventsphere')
+
+    return _feed_response(request, 'My EventSphere favorites', favorites, component)
+
+
+@conditional_page(_events_by_category_state)
+def category_feed(request, slug):
+    category = get_object_or_404(Category, slug=slug)
+    events = Event.objects.filter(category=category, is_active=True).select_related('venue').order_by('date', 'id')
+
+    def component(event):
+        return ical.event_component(event, request, uid=f'event-{event.pk}@eventsphere')
+
+    return _feed_response(request, f'EventSphere: {category.name}', events, component)
+
+
+@login_required
+@require_POST
+@idempotent('cancel_booking')
 def cancel_booking(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id, user=request.user)
 
-    if booking.status == 'confirmed' and booking.event.date > timezone.now():
-        booking.status = 'cancelled'
-        booking.save()
-
-        # Create notification
-        from notifications.views import create_notification
-        create_notification(
-            user=request.user,
-            title='Booking Cancelled',
-            message=f'Your booking for {booking.event.title} has been cancelled. Booking reference: {booking.booking_reference}',
-            notification_type='booking_cancelled',
-            event=booking.event,
-            booking=booking
-        )
+    if booking.status == 'pending':
+        # Abandoned checkout: just give the held seats back
+        try:
+            with transaction.atomic():
+                released = release_booking(booking, from_status='pending')
+        except seatmap.SectionBusy:
+            messages.error(request, 'Your seat hold could not be released right now. Please try again.')
+            return redirect('events:my_bookings')
+        if released:
+            messages.success(request, 'Your seat hold has been released.')
+        return redirect('events:my_bookings')
 
-        # Send cancellation email
-        from .email_utils import send_booking_cancellation_email
-        send_booking_cancellation_email(booking)
+    if booking.status == 'confirmed' and booking.event.date > timezone.now():
+        try:
+            with transaction.atomic():
+                cancelled = release_booking(booking)
+                if cancelled:
+                    enqueue_notification(
+                        user=request.user,
+                        title='Booking Cancelled',
+                        message=f'Your booking for {booking.event.title} has been cancelled. Booking reference: {booking.booking_reference}',
+                        notification_type='booking_cancelled',
+                        event=booking.event,
+                        booking=booking
+                    )
+                    enqueue('email.booking_cancellation', booking_id=booking.id)
+        except seatmap.SectionBusy:
+            messages.error(request, 'This booking could not be cancelled right now. Please try again.')
+            return redirect('events:my_bookings')
+
+        if not cancelled:
+            messages.error(request, 'Cannot cancel this booking.')
+            return redirect('events:my_bookings')
 
         messages.success(request, 'Booking cancelled successfully.')
     else:
@@ -258,6 +532,58 @@ def cancel_booking(request, booking_id):
     return redirect('events:my_bookings')
 
 
+def _checkin_event(request, event_id):
+    """Return the event if the user may run its gates, otherwise None"""
+    event = get_object_or_404(Event, id=event_id)
+    if request.user.is_staff or event.created_by_id == request.user.id:
+        return event
+    return None
+
+
+@login_required
+def checkin_manifest(request, event_id):
+    """Valid ticket numbers for gate devices to preload for offline scanning"""
+    event = _checkin_event(request, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Not allowed to check in this event.'}, status=403)
+
+    tickets = checkin.get_index(event.id).manifest()
+    return JsonResponse({'event': event.id, 'count': len(tickets), 'tickets': tickets})
+
+
+def _checkin_batch(request, event_id, offline):
+    event = _checkin_event(request, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Not allowed to check in this event.'}, status=403)
+
+    try:
+        scans = json.loads(request.body)['scans']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body with a "scans" list.'}, status=400)
+
+    if not isinstance(scans, list) or not all(isinstance(scan, dict) for scan in scans):
+        return JsonResponse({'error': 'Expected a JSON body with a "scans" list.'}, status=400)
+    if len(scans) > CHECKIN_MAX_BATCH:
+        return JsonResponse({'error': f'At most {CHECKIN_MAX_BATCH} scans per request.'}, status=400)
+
+    results, summary = checkin.process_scans(event, scans, offline=offline)
+    return JsonResponse({'event': event.id, 'summary': summary, 'results': results})
+
+
+@login_required
+@require_POST
+def checkin_scans(request, event_id):
+    """Admit a batch of live gate scans"""
+    return _checkin_batch(request, event_id, offline=False)
+
+
+@login_required
+@require_POST
+def checkin_sync(request, event_id):
+    """Upload scans buffered by a gate device while it was offline"""
+    return _checkin_batch(request, event_id, offline=True)
+
+
 @login_required
 def create_event(request):
     if request.method == 'POST':
@@ -0,0 +1,107 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+TOKEN_SALT = 'events.waiting_room'
+TOKEN_MAX_AGE = getattr(settings, 'WAITING_ROOM_TOKEN_MAX_AGE', 60 * 60 * 6)
+ROOM_CACHE_TIMEOUT = getattr(settings, 'WAITING_ROOM_CACHE_TIMEOUT', 30)
+SESSION_KEY = 'waiting_room_tokens'
+
+
+def _room_key(event_id):
+    return f'waiting_room:{event_id}'
+
+
+def get_admission_rate(event_id):
+    """Return the admission rate of the event's enabled waiting room, or None.
+
+    The answer is cached briefly so book_event and status polling do not
+    query the database on every request.
+    """
+    key = _room_key(event_id)
+    rate = cache.get(key)
+    if rate is None:
+        from .models import WaitingRoom
+        rate = WaitingRoom.objects.filter(event_id=event_id, is_enabled=True).values_list(
+            'admission_rate', flat=True
+        ).first()
+        # Cache "no room" as 0 so regular events skip the lookup as well
+        rate = rate or 0
+        cache.set(key, rate, ROOM_CACHE_TIMEOUT)
+    return rate or None
+
+
+def forget_room(event_id):
+    cache.delete(_room_key(event_id))
+
+
+def join(event_id, user):
+    """Give the user the next queue position and admission time as a signed token.
+
+    Admission times are spaced 60 / admission_rate seconds apart, so at most
+    admission_rate users per minute are let through however many arrive at
+    once. The token carries everything needed to answer status polls.
+    """
+    from .models import WaitingRoom
+    now = timezone.now()
+    with transaction.atomic():
+        # The counter UPDATE locks the room row until commit, which serialises
+        # concurrent joins on this event only
+        WaitingRoom.objects.filter(event_id=event_id).update(issued_count=F('issued_count') + 1)
+        room = WaitingRoom.objects.get(event_id=event_id)
+        admit_at = max(now, room.opens_at, room.next_admission_at or now)
+        WaitingRoom.objects.filter(pk=room.pk).update(
+            next_admission_at=admit_at + timedelta(seconds=60 / max(room.admission_rate, 1))
+        )
+    return signing.dumps(
+        {'e': event_id, 'u': user.pk, 'p': room.issued_count, 'a': admit_at.timestamp()},
+        salt=TOKEN_SALT
+    )
+
+
+def read_token(token, event_id, user):
+    """Return the data stored in a token, or None if it is invalid"""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get('e') != event_id or data.get('u') != user.pk:
+        return None
+    return data
+
+
+def get_ticket(request, event_id, join_queue=False):
+    """Return the user's queue token data for an event, joining the queue if asked"""
+    tokens = request.session.get(SESSION_KEY, {})
+    data = None
+    token = tokens.get(str(event_id))
+    if token:
+        data = read_token(token, event_id, request.user)
+
+    if data is None and join_queue:
+        token = join(event_id, request.user)
+        tokens[str(event_id)] = token
+        request.session[SESSION_KEY] = tokens
+        data = read_token(token, event_id, request.user)
+
+    return data
+
+
+def is_admitted(data):
+    return data is not None and timezone.now().timestamp() >= data['a']
+
+
+def queue_status(data, admission_rate):
+    wait_seconds = max(data['a'] - timezone.now().timestamp(), 0)
+    return {
+        'position': data['p'],
+        'admitted': wait_seconds == 0,
+        'ahead': math.ceil(wait_seconds * admission_rate / 60),
+        'wait_seconds': int(wait_seconds),
+    }
@@ -80,6 +80,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than shared-cache memory, so tests running several
+        # connections at once get SQLite's real locking and busy timeout
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -142,6 +145,62 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For developm
 # EMAIL_HOST_PASSWORD = 'your-app-password'
 DEFAULT_FROM_EMAIL = 'EventSphere <noreply@eventsphere.com>'
 
+# Outbox delivery (python manage.py process_outbox)
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
+
+# How long a pending booking holds its seats during checkout
+BOOKING_HOLD_MINUTES = 10
+
+# Booking reference and ticket number allocation (see events/ids.py)
+ID_ALLOCATOR = 'events.ids.SequenceBlockAllocator'
+ID_BLOCK_SIZE = 1000
+
+# Idempotency keys for booking POSTs are remembered this many seconds
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+# How long a duplicate waits for the first request to finish before giving up
+IDEMPOTENCY_REPLAY_WAIT = 5
+
+# Venue gate check-in
+CHECKIN_INDEX_TTL = 300
+CHECKIN_MAX_BATCH = 5000
+
+# Waiting room admission tokens
+WAITING_ROOM_TOKEN_MAX_AGE = 60 * 60 * 6
+WAITING_ROOM_CACHE_TIMEOUT = 30
+
+# Event text search: 'fts' uses the SQLite FTS5 index (see events/search.py),
+# 'icontains' the plain LIKE filters
+EVENT_SEARCH_BACKEND = 'fts'
+SEARCH_MAX_RESULTS = 1000
+# Per-process cache of search result ids, invalidated on any catalog change
+SEARCH_CACHE_SIZE = 512
+SEARCH_CACHE_TIMEOUT = 300
+# Sampled log of searches for the replay_search_log benchmark; None disables it
+SEARCH_LOG_PATH = BASE_DIR / 'logs' / 'search.jsonl'
+SEARCH_LOG_SAMPLE_RATE = 0.01
+
+# The homepage snapshot is rebuilt in the background once it is this old
+HOME_SNAPSHOT_MAX_AGE = 300
+
+# Rendered event cards, keyed by event id and updated_at
+EVENT_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Search box suggestions are served from a per-process index rebuilt this often
+AUTOCOMPLETE_INDEX_TTL = 600
+
+# Reviews shown on an event page, and per "Show more reviews" request
+REVIEWS_PAGE_SIZE = 5
+
+# Rendered calendar months and agendas, keyed by catalog version
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Sales rollups (python manage.py update_sales_rollups) leave out bookings
+# changed in the last this many seconds, for transactions still committing
+SALES_ROLLUP_LAG = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationPreference, OutboxMessage
 
 
 @admin.register(Notification)
@@ -15,3 +15,10 @@ class NotificationPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'email_notifications', 'booking_confirmations', 'event_reminders']
     list_filter = ['email_notifications', 'booking_confirmations', 'event_reminders']
     search_fields = ['user__username']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['topic', 'status', 'attempts', 'available_at', 'created_at', 'delivered_at']
+    list_filter = ['status', 'topic']
+    readonly_fields = ['created_at', 'delivered_at', 'claimed_by', 'last_error']
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from notifications.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued notifications and emails from the outbox with a pool of workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the messages that are currently due and exit')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+
+        workers = max(options['workers'], 1)
+        self.stdout.write(f'Starting {workers} outbox worker(s)...')
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self.work, f'worker-{i}', options)
+                for i in range(workers)
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stop.set()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Outbox processing stopped. Delivered: {self.delivered}, Failed: {self.failed}'
+            )
+        )
+
+    def work(self, worker_id, options):
+        try:
+            while not self.stop.is_set():
+                try:
+                    delivered, failed = process_batch(options['batch_size'], worker_id)
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'{worker_id}: {e}'))
+                    delivered = failed = 0
+                    if options['once']:
+                        return
+
+                with self.lock:
+                    self.delivered += delivered
+                    self.failed += failed
+
+                if delivered or failed:
+                    continue
+                if options['once']:
+                    return
+                self.stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
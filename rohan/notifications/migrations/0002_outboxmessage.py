@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_by', models.CharField(blank=True, max_length=64)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['available_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='notificatio_status_676d13_idx')],
+            },
+        ),
+    ]
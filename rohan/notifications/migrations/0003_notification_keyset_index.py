@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_listing_indexes'),
+        ('notifications', '0002_outboxmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notificatio_user_id_90f3d6_idx'),
+        ),
+    ]
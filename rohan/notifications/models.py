@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from events.models import Event, Booking
 
 
@@ -25,6 +26,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -40,3 +44,38 @@ class NotificationPreference(models.Model):
 
     def __str__(self):
         return f"Notification preferences for {self.user.username}"
+
+
+class OutboxMessage(models.Model):
+    """Side effect recorded in the same transaction as the change that caused it.
+
+    Messages are delivered at least once by the process_outbox command, so
+    handlers must tolerate being run again for the same message.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Next time the message may be claimed: the retry time while pending,
+    # the lease expiry while processing
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
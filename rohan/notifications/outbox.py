@@ -0,0 +1,146 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+RETRY_BASE_SECONDS = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+RETRY_MAX_SECONDS = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 3600)
+LEASE_SECONDS = getattr(settings, 'OUTBOX_LEASE_SECONDS', 300)
+
+HANDLERS = {}
+
+
+def handler(topic):
+    """Register a function that delivers outbox messages for a topic"""
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, **payload):
+    """Record a side effect to be delivered after the current transaction commits"""
+    if topic not in HANDLERS:
+        raise ValueError(f'No outbox handler registered for {topic!r}')
+    return OutboxMessage.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_notification(user, title, message, notification_type, event=None, booking=None):
+    """Outbox counterpart of notifications.views.create_notification"""
+    return enqueue(
+        'notification.create',
+        user_id=user.pk,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        event_id=event.pk if event else None,
+        booking_id=booking.pk if booking else None,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at RETRY_MAX_SECONDS"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size, worker_id=None):
+    """Lease up to batch_size due messages to this worker.
+
+    Pending messages whose retry time has passed and processing messages whose
+    lease ran out (a worker died mid-delivery) are both claimable. The claim is
+    a single UPDATE tagged with a unique token, so concurrent workers never
+    receive the same message.
+    """
+    now = timezone.now()
+    token = f'{worker_id or "worker"}:{uuid.uuid4().hex[:12]}'
+    due = Q(status='pending') | Q(status='processing')
+    candidates = list(
+        OutboxMessage.objects.filter(due, available_at__lte=now)
+        .order_by('available_at', 'id')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return []
+
+    OutboxMessage.objects.filter(due, pk__in=candidates, available_at__lte=now).update(
+        status='processing',
+        claimed_by=token,
+        attempts=F('attempts') + 1,
+        available_at=now + timedelta(seconds=LEASE_SECONDS),
+    )
+    return list(OutboxMessage.objects.filter(claimed_by=token, status='processing').order_by('id'))
+
+
+def deliver(message):
+    """Run the handler for one claimed message and record the outcome"""
+    func = HANDLERS.get(message.topic)
+    try:
+        if func is None:
+            raise LookupError(f'No outbox handler registered for {message.topic!r}')
+        func(**message.payload)
+    except Exception as e:
+        if message.attempts >= MAX_ATTEMPTS:
+            status, available_at = 'failed', timezone.now()
+        else:
+            status, available_at = 'pending', timezone.now() + retry_delay(message.attempts)
+        OutboxMessage.objects.filter(pk=message.pk, claimed_by=message.claimed_by).update(
+            status=status,
+            available_at=available_at,
+            last_error=f'{type(e).__name__}: {e}',
+        )
+        return False
+
+    OutboxMessage.objects.filter(pk=message.pk, claimed_by=message.claimed_by).update(
+        status='delivered',
+        delivered_at=timezone.now(),
+        last_error='',
+    )
+    return True
+
+
+def process_batch(batch_size=50, worker_id=None):
+    """Claim and deliver one batch, returns (delivered, failed) counts"""
+    delivered = failed = 0
+    for message in claim_batch(batch_size, worker_id):
+        if deliver(message):
+            delivered += 1
+        else:
+            failed += 1
+    return delivered, failed
+
+
+@handler('notification.create')
+def create_notification_handler(user_id, title, message, notification_type, event_id=None, booking_id=None):
+    from .models import Notification
+    Notification.objects.create(
+        user_id=user_id,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        event_id=event_id,
+        booking_id=booking_id
+    )
+
+
+def _booking(booking_id):
+    from events.models import Booking
+    return Booking.objects.select_related('user', 'event', 'event__venue').get(pk=booking_id)
+
+
+@handler('email.booking_confirmation')
+def booking_confirmation_email_handler(booking_id):
+    from events.email_utils import send_booking_confirmation_email
+    send_booking_confirmation_email(_booking(booking_id), fail_silently=False)
+
+
+@handler('email.booking_cancellation')
+def booking_cancellation_email_handler(booking_id):
+    from events.email_utils import send_booking_cancellation_email
+    send_booking_cancellation_email(_booking(booking_id), fail_silently=False)
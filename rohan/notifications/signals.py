@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with sender=Notification, user_id and count when notifications are
+# marked read by an UPDATE, which sends no post_save
+notifications_read = Signal()
@@ -2,8 +2,9 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.core.paginator import Paginator
+from events.pagination import paginate
 from .models import Notification, NotificationPreference
+from .signals import notifications_read
 
 
 @login_required
@@ -11,9 +12,7 @@ def notification_list(request):
     notifications = Notification.objects.filter(user=request.user)
 
     # Pagination
-    paginator = Paginator(notifications, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, notifications, 20, ('-created_at', '-id'))
 
     context = {
         'page_obj': page_obj,
@@ -25,8 +24,8 @@ def notification_list(request):
 @login_required
 def mark_as_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+        notifications_read.send(sender=Notification, user_id=request.user.pk, count=1)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'success': True})
@@ -36,7 +35,9 @@ def mark_as_read(request, notification_id):
 
 @login_required
 def mark_all_as_read(request):
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    if count:
+        notifications_read.send(sender=Notification, user_id=request.user.pk, count=count)
     messages.success(request, 'All notifications marked as read.')
     return redirect('notifications:notification_list')
 
@@ -20,6 +20,14 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Search suggestions
+    const autocompleteUrl = document.body.dataset.autocompleteUrl;
+    if (autocompleteUrl) {
+        document.querySelectorAll('form[action*="search"] input[name="q"], input[data-autocomplete]').forEach(input => {
+            setupAutocomplete(input, autocompleteUrl);
+        });
+    }
+
     // Favorite button functionality
     const favoriteButtons = document.querySelectorAll('.favorite-btn');
     favoriteButtons.forEach(button => {
@@ -102,6 +110,110 @@ function toggleFavorite(button) {
     });
 }
 
+// Suggest events, venues and cities while typing in a search box
+function setupAutocomplete(input, url) {
+    const menu = document.createElement('div');
+    menu.className = 'list-group position-absolute shadow-sm d-none';
+    menu.style.zIndex = '1050';
+    menu.style.minWidth = '100%';
+    input.parentNode.style.position = 'relative';
+    input.parentNode.appendChild(menu);
+    input.setAttribute('autocomplete', 'off');
+
+    const icons = {event: 'fa-calendar', venue: 'fa-map-marker-alt', city: 'fa-city'};
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function hide() {
+        menu.classList.add('d-none');
+        menu.innerHTML = '';
+        active = -1;
+    }
+
+    function highlight(index) {
+        const items = menu.querySelectorAll('a');
+        items.forEach(item => item.classList.remove('active'));
+        if (index >= 0 && index < items.length) {
+            items[index].classList.add('active');
+        }
+        active = index;
+    }
+
+    function render(results) {
+        menu.innerHTML = '';
+        active = -1;
+        if (!results.length) {
+            hide();
+            return;
+        }
+        results.forEach(result => {
+            const item = document.createElement('a');
+            item.className = 'list-group-item list-group-item-action';
+            item.href = result.url;
+            const icon = document.createElement('i');
+            icon.className = 'fas ' + (icons[result.type] || 'fa-search') + ' me-2 text-muted';
+            const label = document.createElement('span');
+            label.textContent = result.label;
+            const detail = document.createElement('small');
+            detail.className = 'text-muted ms-2';
+            detail.textContent = result.detail;
+            item.append(icon, label, detail);
+            menu.appendChild(item);
+        });
+        menu.classList.remove('d-none');
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (query.length < 2) {
+            hide();
+            return;
+        }
+        timer = setTimeout(() => {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(`${url}?q=${encodeURIComponent(query)}`, {signal: controller.signal})
+                .then(response => response.json())
+                .then(data => {
+                    if (data.query === input.value.trim()) {
+                        render(data.results);
+                    }
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error:', error);
+                    }
+                });
+        }, 150);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        const items = menu.querySelectorAll('a');
+        if (!items.length) {
+            return;
+        }
+        if (e.key === 'ArrowDown') {
+            e.preventDefault();
+            highlight((active + 1) % items.length);
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active <= 0 ? items.length - 1 : active - 1);
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            e.stopImmediatePropagation();
+            window.location.href = items[active].href;
+        } else if (e.key === 'Escape') {
+            hide();
+        }
+    });
+
+    input.addEventListener('blur', () => setTimeout(hide, 200));
+}
+
 // Get CSRF token from cookies
 function getCookie(name) {
     let cookieValue = null;